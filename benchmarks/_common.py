@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_MODEL_DIR = os.path.join(ROOT, "ml-model")
+LOOM_DIR = os.path.join(ROOT, "loom")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def add_service_paths():
+    """Make `main` (ml-model), the `app` package (loom) and `common` importable"""
+    for path in (ROOT, ML_MODEL_DIR, LOOM_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize_us(samples):
+    """Summary of per-operation timings (seconds in, microseconds out)"""
+    values = sorted(s * 1e6 for s in samples)
+    return {
+        "mean_us": round(statistics.fmean(values), 3),
+        "median_us": round(statistics.median(values), 3),
+        "stdev_us": round(statistics.stdev(values), 3) if len(values) > 1 else 0.0,
+        "min_us": round(values[0], 3),
+        "p95_us": round(percentile(values, 0.95), 3),
+        "p99_us": round(percentile(values, 0.99), 3),
+    }
+
+
+def bench(name, func, repeat=7, warmup=1, min_time=0.1):
+    """Time func() pyperf-style: calibrate a loop count so one run takes at
+    least min_time, then report per-call statistics over `repeat` runs."""
+    for _ in range(warmup):
+        func()
+
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 24:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - started) / loops)
+
+    result = {"name": name, "loops": loops, "repeat": repeat, **summarize_us(samples)}
+    print(f"{name:<40} {result['median_us']:>12.2f} us  (+- {result['stdev_us']:.2f}, {loops} loops)")
+    return result
+
+
+def metadata():
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(kind, results, output=None):
+    """Write {"kind", "metadata", "results"} JSON and return its path"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w") as f:
+        json.dump({"kind": kind, "metadata": metadata(), "results": results}, f, indent=2)
+    print(f"\nResults written to {output}")
+    return output
+
+
+def compare(previous_path, results, key):
+    """Print the relative change of `key` against a previous results file"""
+    with open(previous_path) as f:
+        previous = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\nChange vs {previous_path} ({key}):")
+    for result in results:
+        before = previous.get(result["name"])
+        if not before or not before.get(key):
+            continue
+        change = 100.0 * (result[key] - before[key]) / before[key]
+        print(f"  {result['name']:<40} {before[key]:>12.2f} -> {result[key]:>12.2f}  ({change:+.1f}%)")
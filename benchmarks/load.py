@@ -0,0 +1,154 @@
+"""In-process async load generator for the ML and Loom services.
+
+Drives the ASGI apps through httpx.ASGITransport (no sockets), with the
+Gemini upstream replaced by a local stub, and reports latency percentiles
+and throughput per endpoint.
+
+    python benchmarks/load.py [--requests N] [--concurrency C] [--upstream-ms MS]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+
+from _common import add_service_paths, compare, percentile, write_results
+
+# Settings must be in place before the services are imported: load the
+# outbreak model before the run instead of during it, keep mood logs and
+# the event log out of the working tree and lift the upstream rate limit
+# so the dispatcher does not throttle the run.
+os.environ.setdefault("ML_MODEL_WARMUP", "0")
+_TMP = tempfile.mkdtemp(prefix="loom-bench-")
+os.environ.setdefault("LOOM_MOOD_DB_PATH", os.path.join(_TMP, "mood_logs.db"))
+os.environ.setdefault("ML_EVENT_LOG_DIR", os.path.join(_TMP, "events"))
+os.environ.setdefault("LOOM_LLM_RATE_PER_SECOND", "1000000")
+os.environ.setdefault("LOOM_LLM_BURST", "1000000")
+os.environ.setdefault("LOOM_LLM_MAX_CONCURRENCY", "1000")
+os.environ.setdefault("LOOM_LLM_MAX_QUEUE", "100000")
+
+add_service_paths()
+
+import httpx  # noqa: E402
+
+import main as ml  # noqa: E402  (ml-model/main.py)
+from app import http_client  # noqa: E402
+from app import main as loom  # noqa: E402
+from micro import SYMPTOM_LISTS  # noqa: E402
+
+CHAT_MESSAGES = [
+    "I feel anxious today",
+    "I can't sleep at night",
+    "Everything feels heavy and I am tired",
+    "I am worried about my exams",
+    "I feel lonely in the evenings",
+]
+MOODS = ["😊", "😢", "😰", "😡", "😴"]
+
+
+def stub_upstream(latency_ms):
+    async def handler(request):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return httpx.Response(200, json={
+            "candidates": [{"content": {"parts": [{"text": "Let's take a slow breath together."}]}}]
+        })
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def drive(name, client, make_request, total, concurrency):
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            method, url, body = make_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    values = sorted(v * 1000 for v in latencies)
+    result = {
+        "name": name,
+        "requests": len(values),
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 1),
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+    print(f"{name:<28} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:.2f}ms  "
+          f"p95 {result['p95_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms  errors {errors}")
+    return result
+
+
+def outbreak_request(i):
+    return "POST", "/predict-outbreak", {
+        "patient_id": f"bench-{i}",
+        "symptoms": SYMPTOM_LISTS[i % len(SYMPTOM_LISTS)],
+        "location": f"Camp {i % 7}",
+        "severity": ("high", "medium", "low")[i % 3],
+        "duration": ("1-3-days", "3-7-days", "more-than-week")[i % 3],
+    }
+
+
+def chat_request(i):
+    # Suffix makes most prompts distinct so the response cache does not hide the upstream path
+    return "POST", "/mental-health/chat", {
+        "text": f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} #{i}",
+        "user_id": f"user-{i % 500}",
+    }
+
+
+def mood_request(i):
+    return "POST", "/mental-health/mood", {"emoji": MOODS[i % len(MOODS)], "user_id": f"user-{i % 500}"}
+
+
+async def run(total, concurrency, upstream_ms):
+    results = []
+
+    async with ml.app.router.lifespan_context(ml.app):
+        await ml.model_registry.ensure_loaded()
+        transport = httpx.ASGITransport(app=ml.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ml") as client:
+            results.append(await drive("ml /predict-outbreak", client, outbreak_request, total, concurrency))
+
+    async with loom.app.router.lifespan_context(loom.app):
+        await http_client.close_client()
+        http_client._client = stub_upstream(upstream_ms)
+        transport = httpx.ASGITransport(app=loom.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loom") as client:
+            results.append(await drive("loom /mental-health/chat", client, chat_request, total, concurrency))
+            results.append(await drive("loom /mental-health/mood", client, mood_request, total, concurrency))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--upstream-ms", type=float, default=0.0, help="stub Gemini latency")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    parser.add_argument("--compare", help="previous load results JSON to diff against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.upstream_ms))
+    write_results("load", results, args.output)
+    if args.compare:
+        compare(args.compare, results, "p95_ms")
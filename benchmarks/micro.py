@@ -0,0 +1,159 @@
+"""Microbenchmarks for the ML and Loom hot paths.
+
+    python benchmarks/micro.py [--quick] [--output FILE] [--compare OLD.json]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from _common import add_service_paths, bench, compare, write_results
+
+add_service_paths()
+
+import main as ml  # noqa: E402  (ml-model/main.py)
+from schemas import Duration, Severity  # noqa: E402
+from app import mental_health as loom  # noqa: E402
+from app.conversation import ConversationStore  # noqa: E402
+from app.detector import detector  # noqa: E402
+from app.normalization import fold  # noqa: E402
+from app.response_engine import offline_engine  # noqa: E402
+from common.metrics import MetricsRegistry  # noqa: E402
+
+SYMPTOM_LISTS = [
+    ["fever", "cough", "difficulty_breathing"],
+    ["Fever", "diarrhea", "vomiting", "fatigue"],
+    ["headache", "rash"],
+    ["high_fever", "chest_pain", "cough", "body_aches", "loss_of_appetite"],
+    ["sore_throat", "runny_nose"],
+    ["severe_pain", "nausea", "dizziness", "fever", "chills", "sweating"],
+]
+
+FILLER = (
+    "I have been living in the camp for a few months now and most days are long. "
+    "The nights are cold and it is hard to sleep because of the noise around the tents. "
+    "I try to keep busy by helping with the water distribution and talking to neighbours. "
+)
+LONG_MESSAGE = FILLER * 12
+LONG_CRISIS_MESSAGE = LONG_MESSAGE + "Sometimes I feel like I can't go on."
+ARABIC_MESSAGE = "أَشْعُرُ بِالقَلَقِ طَوَالَ الوَقْتِ وَلَا أَسْتَطِيعُ النَّوْمَ، أُرِيـــدُ مَنْ يَسْمَعُنِي"
+
+
+def patients(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        ml.PatientData(
+            patient_id=f"p{i}",
+            symptoms=rng.choice(SYMPTOM_LISTS),
+            location=rng.choice(["Camp A", "Camp B", "Town Center", "camp_north"]),
+            severity=rng.choice(["high", "Medium", "low"]),
+            duration=rng.choice(["1-3-days", "3-7-days", "more-than-week"]),
+        )
+        for i in range(n)
+    ]
+
+
+def run(quick=False):
+    repeat = 3 if quick else 7
+    min_time = 0.05 if quick else 0.2
+    results = []
+
+    def add(name, func):
+        results.append(bench(name, func, repeat=repeat, min_time=min_time))
+
+    predictor = ml.predictor
+    cycle = iter(range(1 << 62))
+
+    def predict_one():
+        symptoms = SYMPTOM_LISTS[next(cycle) % len(SYMPTOM_LISTS)]
+        predictor.predict_risk(symptoms, Severity.HIGH, "Camp A", Duration.THREE_TO_SEVEN_DAYS)
+
+    add("ml.predict_risk", predict_one)
+
+    batch = patients(1000)
+    add("ml.predict_risk_batch[1000]", lambda: predictor.predict_risk_batch(batch))
+
+    detector_ = ml.ClusterDetector()
+    add("ml.cluster_detector.observe", lambda: detector_.observe("Camp A", SYMPTOM_LISTS[0]))
+
+    events = ml.EventLog(os.path.join(tempfile.mkdtemp(prefix="ml-bench-"), "events"))
+
+    def push_event():
+        events.push("p1", "Camp A", SYMPTOM_LISTS[0], Severity.HIGH, Duration.ONE_TO_THREE_DAYS)
+        events._queue.get_nowait()
+
+    add("ml.event_log.push", push_event)
+    event = (0.0, "p1", "Camp A", SYMPTOM_LISTS[3], Severity.HIGH, Duration.ONE_TO_THREE_DAYS)
+
+    def append_event():
+        events._append(event)
+        if len(events._columns["ts"]) >= 100000:
+            events._reset()
+
+    add("ml.event_log.append[writer]", append_event)
+
+    sample = batch[0]
+    add("ml.build_prediction+json", lambda: json.dumps(ml.build_prediction(sample, 0.82, None, 12, [])))
+    add("ml.prediction_response[typed]", lambda: ml.PredictionResponse(
+        success=True, data=ml.build_prediction(sample, 0.82, None, 12, [])
+    ).model_dump_json())
+
+    raw = sample.model_dump(mode="json")
+    add("ml.PatientData.validate", lambda: ml.PatientData.model_validate(raw))
+
+    add("loom.detector.scan[short]", lambda: detector.scan("I feel anxious and can't sleep"))
+    add(f"loom.detector.scan[{len(LONG_MESSAGE)}ch]", lambda: detector.scan(LONG_MESSAGE))
+    add(f"loom.detector.scan[{len(LONG_CRISIS_MESSAGE)}ch crisis]", lambda: detector.scan(LONG_CRISIS_MESSAGE))
+    add("loom.detector.scan[ar]", lambda: detector.scan(ARABIC_MESSAGE))
+    # Unmemoized, i.e. the first stage to see a message
+    add("loom.normalization.fold[ar]", lambda: fold(ARABIC_MESSAGE))
+    add(f"loom.normalization.fold[{len(LONG_MESSAGE)}ch]", lambda: fold(LONG_MESSAGE))
+
+    chat_response = {
+        "success": True,
+        "response": FILLER,
+        "crisis_detected": False,
+        "support_resources": loom.SUPPORT_RESOURCES,
+    }
+    add("loom.chat_response+json", lambda: json.dumps(chat_response))
+    add("loom.crisis_response+json", lambda: json.dumps(loom.CRISIS_RESPONSE))
+
+    store = ConversationStore(6, 512, 400, 1800, 50000, 64 * 1024 * 1024)
+    users = [f"user-{i}" for i in range(1000)]
+
+    def chat_turn():
+        user = users[next(cycle) % len(users)]
+        loom.build_prompt("I can't sleep at night", "en", store.context(user))
+        store.append(user, "I can't sleep at night", FILLER)
+
+    add("loom.conversation.turn[context+prompt+append]", chat_turn)
+
+    offline_engine.load()
+    add("loom.offline_engine.respond", lambda: offline_engine.respond("I can't sleep and I keep worrying", "en"))
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "bench", ("route",))
+    counter = registry.counter("bench_total", "bench", ("reason",))
+
+    def timed():
+        with histogram.time("/predict-outbreak"):
+            pass
+
+    add("metrics.histogram.time", timed)
+    add("metrics.counter.inc", lambda: counter.inc("upstream_error"))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter runs")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    parser.add_argument("--compare", help="previous micro results JSON to diff against")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    write_results("micro", results, args.output)
+    if args.compare:
+        compare(args.compare, results, "median_us")
@@ -0,0 +1,99 @@
+"""Cold-start timings for the Loom service.
+
+Each run spawns a fresh interpreter, then times importing app.main, running
+the lifespan startup and serving the first request, and reports the median
+of each phase in milliseconds.
+
+    python benchmarks/startup.py [--runs N] [--output FILE] [--compare OLD.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _common import LOOM_DIR, ROOT, compare, write_results
+
+# The first request is a bare ASGI call so the harness itself imports nothing
+CHILD = r"""
+import asyncio, json, sys, time
+sys.path[:0] = sys.argv[1:]
+started = time.perf_counter()
+from app import main
+imported = time.perf_counter()
+
+async def get(app, path):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"loom")], "client": ("127.0.0.1", 1),
+        "server": ("loom", 80),
+    }
+    done = asyncio.Event()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await app(scope, receive, send)
+    await done.wait()
+
+async def first_request(app):
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        await get(app, "/mental-health/resources")
+        return ready, time.perf_counter()
+
+ready, served = asyncio.run(first_request(main.app))
+print(json.dumps({
+    "import": (imported - started) * 1000,
+    "lifespan": (ready - imported) * 1000,
+    "first_request": (served - ready) * 1000,
+    "total": (served - started) * 1000,
+}))
+"""
+
+
+def run(runs):
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="loom-startup-") as tmp:
+        for i in range(runs):
+            # Fresh database per run so the mood store starts cold too
+            env = dict(os.environ, LOOM_MOOD_DB_PATH=os.path.join(tmp, f"mood-{i}.db"))
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD, LOOM_DIR, ROOT],
+                capture_output=True, text=True, env=env, cwd=LOOM_DIR, check=True,
+            )
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    results = []
+    for phase in samples[0]:
+        values = sorted(sample[phase] for sample in samples)
+        result = {
+            "name": f"loom.startup.{phase}",
+            "runs": runs,
+            "median_ms": round(statistics.median(values), 1),
+            "min_ms": round(values[0], 1),
+            "max_ms": round(values[-1], 1),
+        }
+        print(f"{result['name']:<32} {result['median_ms']:>9.1f} ms  (min {result['min_ms']:.1f}, max {result['max_ms']:.1f})")
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=9, help="fresh interpreters to time")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    parser.add_argument("--compare", help="previous startup results JSON to diff against")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    write_results("startup", results, args.output)
+    if args.compare:
+        compare(args.compare, results, "median_ms")
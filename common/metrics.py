@@ -0,0 +1,237 @@
+"""Prometheus-style metrics shared by the ML and Loom services.
+
+Recording is a dict lookup plus an integer/float add on the event loop
+thread: no locks, no allocation after the first sample of a label set.
+Values are rendered in the Prometheus text exposition format on /metrics.
+"""
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            # [per-bucket counts (+Inf last), sum, count]
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *labels):
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = self._header()
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    # A plain class rather than @contextmanager: no generator per use
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        """Register metric, or return the identical one already registered
+        (an app factory called twice shares its middleware's series)"""
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"metric {metric.name} already registered differently")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    Routes are labelled by their template (/regional-analysis/{location}),
+    resolved once per distinct (method, path) so label cardinality stays
+    bounded by the route table. The table is flattened from the router on
+    the first request, with include_router() and Mount prefixes applied.
+    """
+
+    MAX_CACHED_PATHS = 10000
+
+    def __init__(self, app, registry, router):
+        self.app = app
+        self.router = router
+        self._routes = {}
+        self._table = None
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "HTTP requests currently being handled", ("method", "route")
+        )
+
+    def _route_table(self, routes, prefix=""):
+        """(template, prefix, regex, methods) for every endpoint under routes.
+
+        Routes keep their own compiled regex; prefixed routes are matched by
+        stripping the prefix first, so nothing is recompiled.
+        """
+        table = []
+        for route in routes:
+            included = getattr(route, "original_router", None)
+            if included is not None:
+                # FastAPI include_router() entry: the prefix lives on the include context
+                table.extend(self._route_table(included.routes, prefix + route.include_context.prefix))
+                continue
+            path = getattr(route, "path", None)
+            if path is None:
+                continue
+            children = getattr(route, "routes", None)
+            if children is not None and not hasattr(route, "endpoint"):
+                table.extend(self._route_table(children, prefix + path))
+                continue
+            table.append((prefix + path, prefix, route.path_regex, getattr(route, "methods", None)))
+        return table
+
+    def _route(self, scope):
+        key = (scope["method"], scope["path"])
+        route = self._routes.get(key)
+        if route is None:
+            if self._table is None:
+                self._table = self._route_table(self.router.routes)
+            route = "unmatched"
+            method, path = key
+            for template, prefix, regex, methods in self._table:
+                if (
+                    path.startswith(prefix)
+                    and regex.match(path[len(prefix):])
+                    and (methods is None or method in methods)
+                ):
+                    route = template
+                    break
+            if len(self._routes) >= self.MAX_CACHED_PATHS:
+                self._routes.clear()
+            self._routes[key] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self.in_flight.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.latency.observe(time.perf_counter() - started, method, route, str(status[0]))
+            self.in_flight.dec(method, route)
@@ -0,0 +1,10 @@
+from starlette.responses import JSONResponse
+
+from common.static_response import encode_json
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (stdlib json when it is missing)"""
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
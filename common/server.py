@@ -0,0 +1,73 @@
+"""Command-line launcher shared by the ML and Loom services.
+
+    python main.py --workers 4 --bind 0.0.0.0:8001 --backlog 4096 --keep-alive 15
+
+With --workers > 1 uvicorn's supervisor starts N worker processes on one
+listening socket, replaces any worker that dies and, on SIGHUP, restarts
+the workers one at a time so in-flight requests finish. The worker count is
+exported as WEB_CONCURRENCY so the services can tell they share the
+machine (see worker_count()).
+"""
+import argparse
+import os
+
+
+def worker_count() -> int:
+    """Worker processes serving this app (1 when started without the launcher)"""
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+def parse_bind(bind):
+    """"host:port", ":port" or "unix:/path" -> (host, port, uds)"""
+    if bind.startswith("unix:"):
+        return None, None, bind[len("unix:"):]
+    host, sep, port = bind.rpartition(":")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected host:port or unix:/path, got {bind!r}")
+    return (host.strip("[]") or "0.0.0.0"), int(port), None
+
+
+def build_parser(description, default_port):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--bind", default=f"0.0.0.0:{default_port}",
+                        help="host:port or unix:/path/to/socket (default %(default)s)")
+    parser.add_argument("--workers", type=int, default=worker_count(),
+                        help="worker processes (default $WEB_CONCURRENCY or 1)")
+    parser.add_argument("--backlog", type=int, default=2048, help="listen() backlog")
+    parser.add_argument("--keep-alive", type=float, default=5.0,
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--limit-concurrency", type=int, default=None,
+                        help="per-worker connection cap before answering 503")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds to wait for in-flight requests on shutdown/restart")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true", help="skip per-request log lines")
+    return parser
+
+
+def serve(app, import_string, app_dir, args):
+    """Run app in this process, or import_string in args.workers processes"""
+    import uvicorn
+
+    workers = max(1, args.workers)
+    # Inherited by spawned workers before they import the app
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    host, port, uds = parse_bind(args.bind)
+
+    uvicorn.run(
+        app if workers == 1 else import_string,
+        app_dir=app_dir,
+        host=host or "127.0.0.1",
+        port=port or 8000,
+        uds=uds,
+        workers=workers,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        limit_concurrency=args.limit_concurrency,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+    )
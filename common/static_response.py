@@ -0,0 +1,48 @@
+"""JSON responses encoded once and revalidated with ETags."""
+import hashlib
+import json
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback; same bytes modulo key spacing
+    orjson = None
+
+
+def encode_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class StaticJSON:
+    """A payload serialized once, with a strong ETag derived from its bytes.
+
+    response() answers a matching If-None-Match with an empty 304, otherwise
+    it sends the stored bytes as-is, skipping FastAPI's per-request
+    validation and encoding.
+    """
+
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, payload, cache_control="public, max-age=300", headers=None):
+        self.body = encode_json(payload)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control, **(headers or {})}
+
+    def matches(self, if_none_match) -> bool:
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == "*" or tag == self.etag:
+                return True
+        return False
+
+    def response(self, request) -> Response:
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self.headers)
+        return Response(self.body, media_type="application/json", headers=self.headers)
@@ -1,5 +1,88 @@
 import os
+import sys
 from dotenv import load_dotenv
 load_dotenv()
 
+# Helpers shared with the ML service live in common/ at the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from common.server import worker_count  # noqa: E402
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Browser origins allowed by CORS (comma-separated)
+CORS_ORIGINS = [o.strip() for o in os.getenv(
+    "LOOM_CORS_ORIGINS", "http://localhost:3000,http://localhost:8000"
+).split(",") if o.strip()]
+
+# Shared outbound HTTP client (see app/http_client.py)
+HTTP_MAX_CONNECTIONS = int(os.getenv("LOOM_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("LOOM_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LOOM_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("LOOM_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("LOOM_HTTP_TIMEOUT", "10"))
+HTTP2_ENABLED = os.getenv("LOOM_HTTP2", "1") == "1"
+# Retries for calls that failed before the upstream answered (connection
+# errors, dropped keep-alive connections, 502/503/504), with doubling backoff
+HTTP_RETRIES = int(os.getenv("LOOM_HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("LOOM_HTTP_RETRY_BACKOFF", "0.1"))
+
+# Chat response cache (see app/response_cache.py)
+CACHE_TTL_SECONDS = float(os.getenv("LOOM_CACHE_TTL_SECONDS", "600"))
+CACHE_MAX_ENTRIES = int(os.getenv("LOOM_CACHE_MAX_ENTRIES", "2048"))
+CACHE_MAX_BYTES = int(os.getenv("LOOM_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+CACHE_MAX_PROMPT_CHARS = int(os.getenv("LOOM_CACHE_MAX_PROMPT_CHARS", "200"))
+
+# Recently normalized messages kept by app/normalization.py
+NORMALIZE_CACHE_SIZE = int(os.getenv("LOOM_NORMALIZE_CACHE_SIZE", "1024"))
+
+# Per-user chat context (see app/conversation.py)
+CONTEXT_MAX_TURNS = int(os.getenv("LOOM_CONTEXT_MAX_TURNS", "6"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("LOOM_CONTEXT_TOKEN_BUDGET", "512"))
+CONTEXT_MAX_TURN_CHARS = int(os.getenv("LOOM_CONTEXT_MAX_TURN_CHARS", "400"))
+CONTEXT_IDLE_SECONDS = float(os.getenv("LOOM_CONTEXT_IDLE_SECONDS", "1800"))
+CONTEXT_MAX_SESSIONS = int(os.getenv("LOOM_CONTEXT_MAX_SESSIONS", "50000"))
+CONTEXT_MAX_CHARS = int(os.getenv("LOOM_CONTEXT_MAX_CHARS", str(64 * 1024 * 1024)))
+
+# Outbound LLM dispatcher (see app/dispatcher.py)
+LLM_MAX_CONCURRENCY = int(os.getenv("LOOM_LLM_MAX_CONCURRENCY", "16"))
+LLM_RATE_PER_SECOND = float(os.getenv("LOOM_LLM_RATE_PER_SECOND", "10"))
+LLM_BURST = int(os.getenv("LOOM_LLM_BURST", "20"))
+LLM_MAX_QUEUE = int(os.getenv("LOOM_LLM_MAX_QUEUE", "200"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LOOM_LLM_DEADLINE_SECONDS", "12"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LOOM_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LOOM_BREAKER_RESET_SECONDS", "30"))
+
+# Mood log persistence (see app/mood_store.py)
+MOOD_DB_PATH = os.getenv(
+    "LOOM_MOOD_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mood_logs.db"),
+)
+MOOD_BATCH_SIZE = int(os.getenv("LOOM_MOOD_BATCH_SIZE", "256"))
+MOOD_FLUSH_INTERVAL = float(os.getenv("LOOM_MOOD_FLUSH_INTERVAL", "0.5"))
+MOOD_QUEUE_SIZE = int(os.getenv("LOOM_MOOD_QUEUE_SIZE", "10000"))
+MOOD_TRENDS_MAX_USERS = int(os.getenv("LOOM_MOOD_TRENDS_MAX_USERS", "50000"))
+# With several workers, how stale a user's trend buckets may get before they
+# are rebuilt from the store to pick up moods logged by other workers
+MOOD_TRENDS_REFRESH_SECONDS = float(os.getenv("LOOM_MOOD_TRENDS_REFRESH_SECONDS", "5"))
+
+# Offline reply engine used when Gemini is unreachable (see app/response_engine.py):
+# "local" retrieves a vetted coping response, "none" keeps the canned fallback
+OFFLINE_ENGINE = os.getenv("LOOM_OFFLINE_ENGINE", "local")
+OFFLINE_CORPUS_PATH = os.getenv(
+    "LOOM_OFFLINE_CORPUS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "coping_responses.json"),
+)
+OFFLINE_INDEX_DIR = os.getenv(
+    "LOOM_OFFLINE_INDEX_DIR", os.path.join(os.path.dirname(MOOD_DB_PATH), "offline_index")
+)
+OFFLINE_MIN_SCORE = float(os.getenv("LOOM_OFFLINE_MIN_SCORE", "0.1"))
+
+# Multi-worker mode (see common/server.py): state every worker must see
+# lives in this SQLite file, and per-process limits get a 1/WORKERS share
+WORKERS = worker_count()
+SHARED_STATE_PATH = os.getenv("LOOM_SHARED_STATE_PATH") or (
+    os.path.join(os.path.dirname(MOOD_DB_PATH), "shared_state.db") if WORKERS > 1 else None
+)
@@ -0,0 +1,145 @@
+import time
+from collections import OrderedDict, deque
+
+from app import config
+
+ANONYMOUS_USER = "anonymous"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for Gemini-style tokenizers)"""
+    return (len(text) + 3) // 4
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class _Session:
+    """One user's recent turns.
+
+    ``text`` is the rendered context exactly as it goes into the prompt;
+    ``turns`` holds (chars, tokens) per turn, oldest first, so trimming the
+    oldest turn is a slice of ``text`` and nothing is re-rendered.
+    """
+
+    __slots__ = ("text", "turns", "tokens", "last_seen")
+
+    def __init__(self):
+        self.text = ""
+        self.turns = deque()
+        self.tokens = 0
+        self.last_seen = 0.0
+
+
+class ConversationStore:
+    """Bounded per-user chat history for prompt context.
+
+    Each session keeps at most ``max_turns`` exchanges and ``token_budget``
+    estimated tokens, dropping its oldest turns first. Sessions idle for
+    ``idle_seconds`` expire, and the least recently used ones are evicted
+    when there are more than ``max_sessions`` or their text exceeds
+    ``max_chars`` in total. Anonymous users get no context, since they all
+    share one id. State is per process.
+    """
+
+    def __init__(self, max_turns, token_budget, max_turn_chars, idle_seconds, max_sessions, max_chars,
+                 clock=time.monotonic):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_turn_chars = max_turn_chars
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self._clock = clock
+        self._sessions = OrderedDict()
+        self._chars = 0
+        self.trimmed_turns = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        # LRU order is last-use order, so expired sessions are all at the front
+        oldest = now - self.idle_seconds
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_seen > oldest:
+                break
+            self._drop(user_id, session)
+            self.expirations += 1
+
+    def _drop(self, user_id, session):
+        del self._sessions[user_id]
+        self._chars -= len(session.text)
+
+    def context(self, user_id: str) -> str:
+        """Rendered recent turns for the user, or "" if there are none"""
+        if user_id == ANONYMOUS_USER:
+            return ""
+        self._expire(self._clock())
+        session = self._sessions.get(user_id)
+        return session.text if session is not None else ""
+
+    def append(self, user_id: str, user_text: str, reply: str):
+        """Add one exchange to the user's session"""
+        if user_id == ANONYMOUS_USER:
+            return
+        now = self._clock()
+        self._expire(now)
+
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = self._sessions[user_id] = _Session()
+        else:
+            self._sessions.move_to_end(user_id)
+        session.last_seen = now
+
+        fragment = (
+            f"User: {_clip(user_text, self.max_turn_chars)}\n"
+            f"Assistant: {_clip(reply, self.max_turn_chars)}\n"
+        )
+        tokens = estimate_tokens(fragment)
+        session.text += fragment
+        session.turns.append((len(fragment), tokens))
+        session.tokens += tokens
+        self._chars += len(fragment)
+
+        while session.turns and (len(session.turns) > self.max_turns or session.tokens > self.token_budget):
+            chars, tokens = session.turns.popleft()
+            session.text = session.text[chars:]
+            session.tokens -= tokens
+            self._chars -= chars
+            self.trimmed_turns += 1
+        if not session.turns:
+            self._drop(user_id, session)
+
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._chars > self.max_chars):
+            old_id, old = next(iter(self._sessions.items()))
+            self._drop(old_id, old)
+            self.evictions += 1
+
+    def forget(self, user_id: str):
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._drop(user_id, session)
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "chars": self._chars,
+            "max_chars": self.max_chars,
+            "trimmed_turns": self.trimmed_turns,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+conversations = ConversationStore(
+    max_turns=config.CONTEXT_MAX_TURNS,
+    token_budget=config.CONTEXT_TOKEN_BUDGET,
+    max_turn_chars=config.CONTEXT_MAX_TURN_CHARS,
+    idle_seconds=config.CONTEXT_IDLE_SECONDS,
+    max_sessions=config.CONTEXT_MAX_SESSIONS,
+    max_chars=config.CONTEXT_MAX_CHARS,
+)
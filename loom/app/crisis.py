@@ -1,20 +1,21 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-router = APIRouter()
+from app.detector import detector, CRISIS, EMERGENCY
+from app.metrics import CRISIS_CHECK_SECONDS, CRISIS_DETECTIONS
 
-CRISIS_KEYWORDS = [
-    "suicide", "kill myself", "end it all", "hopeless", "abuse", "emergency", "danger"
-]
+router = APIRouter()
 
 class TextInput(BaseModel):
     text: str
 
 @router.post("/check")
 async def check_crisis(input: TextInput):
-    text = input.text.lower()
-    triggered = any(keyword in text for keyword in CRISIS_KEYWORDS)
+    with CRISIS_CHECK_SECONDS.time("check"):
+        hits = detector.scan(input.text)
+    triggered = CRISIS in hits or EMERGENCY in hits
     if triggered:
+        CRISIS_DETECTIONS.inc("check")
         # Example emergency contact - customize per locale or user details
         contact_info = "Emergency mental health support: 1800-123-4567"
         return {"crisis_detected": True, "emergency_contact": contact_info}
@@ -0,0 +1,172 @@
+import re
+from typing import Dict, Iterable, List, Set
+
+from app.normalization import fold, normalize
+
+CRISIS = "crisis"
+EMERGENCY = "emergency"
+PROHIBITED_TOPIC = "prohibited_topic"
+
+CRISIS_KEYWORDS = [
+    "suicide", "kill myself", "end it all", "hopeless", "want to die",
+    "harm myself", "can't go on", "worthless", "better off dead"
+]
+
+EMERGENCY_KEYWORDS = ["abuse", "emergency", "danger"]
+
+PROHIBITED_TOPICS = ["country", "family", "home", "parents", "motherland"]
+
+# Phrases for the other chat languages. They are folded like the messages
+# (see app/normalization.py), so diacritics, tatweel and letter variants
+# need not be listed; common clitic and possessive forms do.
+LOCALIZED_KEYWORDS = {
+    "ar": {
+        CRISIS: [
+            "انتحار", "الانتحار", "انتحر", "أنتحر", "أقتل نفسي", "قتل نفسي", "أريد أن أموت",
+            "أريد الموت", "أتمنى الموت", "أؤذي نفسي", "إيذاء نفسي", "لا أستطيع الاستمرار",
+            "فقدت الأمل", "لا أمل", "يائس", "بلا قيمة", "لا قيمة لي", "الموت أفضل",
+        ],
+        EMERGENCY: ["إساءة", "اعتداء", "عنف", "طوارئ", "خطر"],
+        PROHIBITED_TOPIC: [
+            "وطن", "الوطن", "وطني", "بلدي", "عائلة", "العائلة", "عائلتي", "أهلي",
+            "بيت", "بيتي", "منزل", "منزلي", "والدي", "والداي", "والدين", "الوالدين",
+        ],
+    },
+    "dari": {
+        CRISIS: [
+            "خودکشی", "خود کشی", "خودم را بکشم", "خود را بکشم", "می‌خواهم بمیرم", "می خواهم بمیرم",
+            "به خودم آسیب", "ناامید", "نا امید", "بی ارزش", "دیگر نمی‌توانم", "دیگر نمی توانم",
+            "مردن بهتر است",
+        ],
+        EMERGENCY: ["آزار", "سوءاستفاده", "خشونت", "اضطراری", "خطر"],
+        PROHIBITED_TOPIC: [
+            "وطن", "وطنم", "کشور", "کشورم", "خانواده", "خانواده‌ام", "خانه", "خانه‌ام",
+            "پدر و مادر", "والدین",
+        ],
+    },
+}
+
+
+def _trie_regex(phrases):
+    """Alternation of phrases factored on shared prefixes.
+
+    ["hope", "hopeless"] becomes ``hope(?:less)?`` so the engine tries at
+    most one branch per character instead of every phrase at every offset.
+    Longer continuations are tried first, giving longest-match semantics.
+    phrases may also map each phrase to a pattern that must follow it
+    (such as ``\\b``); a plain list needs nothing after any phrase.
+    """
+    if not isinstance(phrases, dict):
+        phrases = dict.fromkeys(phrases, "")
+    trie = {}
+    for phrase, end in phrases.items():
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = end
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if "" in node:
+            end = node[""]
+            if not branches:
+                return end
+            if not end:
+                return "(?:" + branches[0] + ")?" if len(branches) == 1 else "(?:" + "|".join(branches) + ")?"
+            branches.append(end)
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+# Arabic proclitics that attach to the next word: conjunction و/ف, then a
+# preposition ب/ل/ك and/or the article ال (ل + ال contracts to لل)
+ARABIC_PROCLITICS = [
+    conjunction + particle
+    for conjunction in ("", "و", "ف")
+    for particle in ("", "ب", "ل", "ك", "ال", "بال", "كال", "لل")
+][1:]
+
+
+def _is_arabic_script(phrase):
+    return "\u0600" <= phrase[0] <= "\u06ff"
+
+
+class KeywordDetector:
+    """Keyword sets for several categories compiled into one regex.
+
+    A single word-bounded, prefix-factored alternation covers every phrase,
+    so a message is normalized once and scanned once no matter how many
+    keywords, categories or languages are configured. Phrases are compiled
+    in the same normalized form as the messages. Matches are longest first; a
+    phrase that contains another whole-word phrase inherits that phrase's
+    categories so the longest-match rule never hides a hit.
+
+    Phrases are whole words, except in open_categories (crisis terms, where
+    a miss costs far more than a false alarm): their single-word phrases
+    also match with any suffix ("hopelessness"), and their Arabic-script
+    phrases also match behind proclitics ("والانتحار"). The proclitic
+    forms are spelled out in the trie rather than as an optional prefix
+    group, which would be tried at every word of every message.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]], open_categories: Iterable[str] = ()):
+        self.categories = {name: list(keywords) for name, keywords in categories.items()}
+        open_categories = set(open_categories)
+
+        phrase_categories = {}
+        for name, keywords in self.categories.items():
+            for keyword in keywords:
+                phrase_categories.setdefault(fold(keyword), set()).add(name)
+
+        phrases = sorted(phrase_categories, key=len, reverse=True)
+        for phrase in phrases:
+            for other in phrases:
+                if other != phrase and re.search(rf"\b{re.escape(other)}\b", phrase):
+                    phrase_categories[phrase] |= phrase_categories[other]
+
+        self._phrase_categories = {p: frozenset(c) for p, c in phrase_categories.items()}
+
+        # Matched text -> phrase, and what must follow each matchable form
+        self._forms = {phrase: phrase for phrase in phrases}
+        ends = {}
+        for phrase in phrases:
+            is_open = bool(phrase_categories[phrase] & open_categories)
+            ends[phrase] = "" if is_open and " " not in phrase else r"\b"
+        for phrase in phrases:
+            if phrase_categories[phrase] & open_categories and _is_arabic_script(phrase):
+                for proclitic in ARABIC_PROCLITICS:
+                    form = proclitic + phrase
+                    if form not in self._forms:
+                        self._forms[form] = phrase
+                        ends[form] = ends[phrase]
+
+        self._pattern = re.compile(r"\b(?:" + _trie_regex(ends) + ")")
+
+    def scan(self, text: str) -> Set[str]:
+        """Every category with at least one keyword in text"""
+        found = set()
+        remaining = len(self.categories)
+        for match in self._pattern.finditer(normalize(text)):
+            found |= self._phrase_categories[self._forms[match.group(0)]]
+            if len(found) == remaining:
+                break
+        return found
+
+    def matches(self, text: str) -> Dict[str, List[str]]:
+        """Matched phrases grouped by category"""
+        found = {}
+        for match in self._pattern.finditer(normalize(text)):
+            phrase = self._forms[match.group(0)]
+            for name in self._phrase_categories[phrase]:
+                found.setdefault(name, []).append(phrase)
+        return found
+
+
+# One detector for every language: messages often mix scripts or arrive
+# with a language code that doesn't match the text
+detector = KeywordDetector({
+    category: [*keywords, *(phrase for language in LOCALIZED_KEYWORDS.values() for phrase in language[category])]
+    for category, keywords in ((CRISIS, CRISIS_KEYWORDS), (EMERGENCY, EMERGENCY_KEYWORDS),
+                               (PROHIBITED_TOPIC, PROHIBITED_TOPICS))
+}, open_categories=(CRISIS,))
@@ -0,0 +1,276 @@
+import asyncio
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app import config
+
+
+class DispatchError(Exception):
+    """Raised when a call is refused before it reaches the upstream"""
+
+
+class DispatcherOverloaded(DispatchError):
+    pass
+
+
+class DispatchTimeout(DispatchError):
+    pass
+
+
+class CircuitOpenError(DispatchError):
+    pass
+
+
+def is_upstream_failure(error):
+    """True for errors that say the upstream is unhealthy.
+
+    Timeouts, transport failures, 5xx and 429 count against the breaker;
+    local bugs, missing configuration and other 4xx rejections say nothing
+    about the upstream, so they must not open it for everyone else.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    httpx = sys.modules.get("httpx")  # only loaded once a client exists
+    if httpx is None:
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, httpx.TransportError) and not isinstance(
+        error, (httpx.LocalProtocolError, httpx.UnsupportedProtocol)
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, deadline):
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait = (1 - self._tokens) / self.rate
+            if self._clock() + wait > deadline:
+                raise DispatchTimeout("rate limit wait exceeds deadline")
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after reset_seconds"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_seconds, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            if self._clock() - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError("upstream circuit open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError("upstream circuit half-open, probe in flight")
+            self._probing = True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+    def release_probe(self):
+        """Probe ended without an upstream result (e.g. timed out while queued)"""
+        self._probing = False
+
+
+class LLMDispatcher:
+    """Admission control in front of outbound model calls.
+
+    Identical in-flight calls share one upstream request (single-flight).
+    Each admitted call waits in a bounded queue for a concurrency slot and a
+    rate-limit token, all within a per-request deadline, and a circuit
+    breaker fails calls fast while the upstream is erroring.
+    """
+
+    def __init__(self, max_concurrency, rate_per_second, burst, max_queue, deadline_seconds,
+                 breaker, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline_seconds = deadline_seconds
+        self.breaker = breaker
+        self._clock = clock
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_second, burst, clock)
+        self._inflight = {}
+        self._waiting = 0
+        self._active = 0
+        self._wait_times = deque(maxlen=1024)
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+        self.upstream_errors = 0
+        self.local_errors = 0
+
+    async def call(self, key, factory):
+        """Run factory() under admission control, sharing the result for equal keys"""
+        if key is None:
+            return await self._run(factory)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._run(factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters re-raise it themselves
+
+    @asynccontextmanager
+    async def slot(self):
+        """Admission control without coalescing, for streamed calls"""
+        deadline = await self._admit()
+        try:
+            yield deadline
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.upstream_errors += 1
+                self.breaker.record_failure()
+            else:
+                self.local_errors += 1
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    async def _run(self, factory):
+        async with self.slot() as deadline:
+            remaining = deadline - self._clock()
+            try:
+                return await asyncio.wait_for(factory(), max(remaining, 0.001))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+
+    async def _admit(self):
+        """Wait for a slot and a token; returns the request deadline"""
+        self.calls += 1
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.short_circuited += 1
+            raise
+
+        started = self._clock()
+        deadline = started + self.deadline_seconds
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()  # free slot, no suspension
+        else:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                self.breaker.release_probe()
+                raise DispatcherOverloaded("LLM wait queue is full")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.deadline_seconds)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self.breaker.release_probe()
+                raise DispatchTimeout("no LLM slot before deadline")
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            finally:
+                self._waiting -= 1
+
+        try:
+            await self._bucket.acquire(deadline)
+        except BaseException as e:
+            self._semaphore.release()
+            self.breaker.release_probe()
+            if isinstance(e, DispatchTimeout):
+                self.timeouts += 1
+            raise
+
+        self._active += 1
+        self._wait_times.append(self._clock() - started)
+        return deadline
+
+    def stats(self):
+        waits = sorted(self._wait_times)
+
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "queue_depth": self._waiting,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "in_flight_keys": len(self._inflight),
+            "wait_ms_p50": percentile(0.50),
+            "wait_ms_p95": percentile(0.95),
+            "breaker_state": self.breaker.state,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "short_circuited": self.short_circuited,
+            "upstream_errors": self.upstream_errors,
+            "local_errors": self.local_errors,
+        }
+
+
+def _per_worker(total):
+    # Limits are configured for the whole service; each worker enforces its share
+    return max(1, -(-total // config.WORKERS))
+
+
+llm_dispatcher = LLMDispatcher(
+    max_concurrency=_per_worker(config.LLM_MAX_CONCURRENCY),
+    rate_per_second=config.LLM_RATE_PER_SECOND / config.WORKERS,
+    burst=_per_worker(config.LLM_BURST),
+    max_queue=_per_worker(config.LLM_MAX_QUEUE),
+    deadline_seconds=config.LLM_DEADLINE_SECONDS,
+    breaker=CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_SECONDS),
+)
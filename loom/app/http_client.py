@@ -0,0 +1,154 @@
+import asyncio
+import importlib.util
+import json
+
+from app import config
+
+# httpx (with its CLI/pygments extras) costs tens of milliseconds to import,
+# so it is imported when the first client is built, normally at app startup
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None  # httpx needs it for http2=True
+
+# Gateway replies that mean "try again"; other statuses are the upstream's answer
+RETRY_STATUSES = {502, 503, 504}
+
+_client = None
+_warmup = None
+
+
+def _build_client():
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=config.HTTP2_ENABLED and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+async def _warm():
+    global _client
+    client = await asyncio.to_thread(_build_client)
+    if _client is None or _client.is_closed:
+        _client = client
+    else:
+        await client.aclose()
+
+
+async def start_client():
+    """Build the pooled client in a worker thread; called once on app startup.
+
+    Importing httpx and loading the CA bundle takes a few hundred
+    milliseconds, so startup does not wait for it: the app serves right
+    away and only the first upstream call waits if the build is not done.
+    """
+    global _warmup
+    if _warmup is None and (_client is None or _client.is_closed):
+        _warmup = asyncio.create_task(_warm())
+
+
+async def _ready_client():
+    global _warmup
+    if _warmup is not None:
+        # wait() rather than await: a failed warm-up falls back to get_client()
+        await asyncio.wait([_warmup])
+        _warmup = None
+    return get_client()
+
+
+async def close_client():
+    """Close pooled connections; called on app shutdown"""
+    global _client, _warmup
+    if _warmup is not None:
+        await asyncio.wait([_warmup])
+        _warmup = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client():
+    """Shared client, created on first use if startup has not run (routers, scripts)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def _retryable(error) -> bool:
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUSES
+    # Connection never made, or a pooled keep-alive connection that the
+    # server had already closed; timeouts are not retried, the upstream
+    # may still be working on the request
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError))
+
+
+async def _backoff(attempt: int):
+    await asyncio.sleep(config.HTTP_RETRY_BACKOFF * 2 ** attempt)
+
+
+async def post_json(url: str, payload: dict, headers: dict, timeout: float = None, retries: int = None) -> dict:
+    """POST a JSON payload over the pooled client and return the decoded body.
+
+    Failures before the upstream answered and 502/503/504 replies are
+    retried up to ``retries`` times (LOOM_HTTP_RETRIES); ``timeout``
+    applies to each attempt.
+    """
+    import httpx
+
+    client = await _ready_client()
+    retries = config.HTTP_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            response = await client.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            if attempt == retries or not _retryable(e):
+                raise
+        await _backoff(attempt)
+
+
+async def stream_sse(url: str, payload: dict, headers: dict, timeout: float = None, retries: int = None):
+    """POST a JSON payload and yield each decoded `data:` event of an SSE reply.
+
+    Retried like post_json, but only until the first event has been
+    yielded; a stream that breaks after that raises.
+    """
+    import httpx
+
+    client = await _ready_client()
+    retries = config.HTTP_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        started = False
+        try:
+            async with client.stream(
+                "POST",
+                url,
+                json=payload,
+                headers=headers,
+                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        data = line[5:].strip()
+                        if data:
+                            started = True
+                            yield json.loads(data)
+            return
+        except httpx.HTTPError as e:
+            if started or attempt == retries or not _retryable(e):
+                raise
+        await _backoff(attempt)
@@ -0,0 +1,439 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+import json
+import time
+from datetime import datetime
+
+from app import config, http_client
+from app.response_cache import response_cache
+from app.conversation import ANONYMOUS_USER, conversations
+from app.response_engine import offline_engine
+from app.detector import detector, CRISIS, PROHIBITED_TOPIC
+from app.dispatcher import llm_dispatcher
+from app.mood_store import mood_store
+from app.mood_trends import MoodTrendIndex, TREND_WINDOWS
+from app.schemas.request_models import ChatInput, MoodInput
+from app.schemas.response_models import ChatResponse, MoodResponse
+from app.metrics import (
+    CRISIS_CHECK_SECONDS, GEMINI_SECONDS, MOOD_SECONDS,
+    CRISIS_DETECTIONS, FALLBACKS, UPSTREAM_ERRORS,
+)
+from common.static_response import StaticJSON, encode_json
+
+router = APIRouter()
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+GEMINI_STREAM_URL = GEMINI_API_URL.replace(":generateContent", ":streamGenerateContent") + "?alt=sse"
+
+CRISIS_RESPONSE = {
+    "success": True,
+    "response": "I'm very concerned about you. Please reach out for immediate help:\n\n🚨 Crisis Helpline: 988 (US)\n🌍 International: 1-800-273-8255\n\nYou are not alone, and help is available.",
+    "crisis_detected": True,
+    "emergency_contacts": [
+        {"name": "Crisis Helpline", "number": "988"},
+        {"name": "International Crisis", "number": "1-800-273-8255"}
+    ],
+    "urgent": True
+}
+
+# Sent as-is on every crisis hit
+CRISIS_RESPONSE_BODY = encode_json(CRISIS_RESPONSE)
+
+SUPPORT_RESOURCES = [
+    "Deep breathing exercises",
+    "Grounding techniques (5-4-3-2-1 method)",
+    "Progressive muscle relaxation",
+    "Mindfulness meditation"
+]
+
+SENSITIVE_TOPIC_RESPONSE = "I understand this might be difficult to talk about. Let's focus on how you're feeling right now and what support you need today. I'm here to listen without judgment."
+EMPTY_REPLY_RESPONSE = "I'm here to support you. How can I help you feel a bit better today?"
+UPSTREAM_ERROR_RESPONSE = "I'm here to listen and support you. Sometimes technology has hiccups, but your feelings are always important to me. Would you like to share what's on your mind?"
+
+MOOD_INTERVENTIONS = {
+    "😊": {
+        "message": "I'm so glad you're feeling good! 🌟",
+        "intervention": "This is wonderful! Try writing down 3 things you're grateful for today to keep this positive momentum.",
+        "activities": ["Journaling", "Share positivity with others", "Nature walk"]
+    },
+    "😢": {
+        "message": "I see you're feeling sad. That's completely okay. 💙",
+        "intervention": "Sadness is a natural emotion. Would you like to try some gentle breathing exercises or talk about what's on your mind?",
+        "activities": ["Deep breathing", "Gentle movement", "Reach out to a friend"]
+    },
+    "😰": {
+        "message": "I notice you're feeling anxious. Let's work through this together. 🤝",
+        "intervention": "Try the 5-4-3-2-1 grounding technique: Name 5 things you see, 4 you can touch, 3 you hear, 2 you smell, 1 you taste.",
+        "activities": ["Grounding exercises", "Slow breathing", "Progressive muscle relaxation"]
+    },
+    "😡": {
+        "message": "I understand you're feeling angry. That's a valid emotion. 🔥",
+        "intervention": "Take slow, deep breaths. Try counting to 10. Physical activity like walking can also help release this energy safely.",
+        "activities": ["Deep breathing", "Physical exercise", "Journaling emotions"]
+    },
+    "😴": {
+        "message": "Feeling tired is your body's way of asking for care. 💤",
+        "intervention": "Rest is important for healing. Try to get adequate sleep and gentle self-care activities.",
+        "activities": ["Rest", "Gentle stretching", "Calming tea"]
+    }
+}
+
+DEFAULT_MOOD_INTERVENTION = {
+    "message": "Thank you for sharing your mood with me. 💚",
+    "intervention": "Every feeling is valid. Would you like to talk about what you're experiencing?",
+    "activities": ["Mindful breathing", "Self-compassion", "Gentle movement"]
+}
+
+# Resources by locale; other languages get English until translations exist
+RESOURCES = {
+    "en": {
+        "crisis_hotlines": [
+            {"name": "National Crisis Hotline", "number": "988", "available": "24/7"},
+            {"name": "Crisis Text Line", "number": "Text HOME to 741741", "available": "24/7"}
+        ],
+        "coping_techniques": [
+            {
+                "name": "Box Breathing",
+                "description": "Breathe in for 4, hold for 4, out for 4, hold for 4",
+                "duration": "2-5 minutes"
+            },
+            {
+                "name": "5-4-3-2-1 Grounding",
+                "description": "Name 5 things you see, 4 you touch, 3 you hear, 2 you smell, 1 you taste",
+                "duration": "3-5 minutes"
+            }
+        ],
+        "self_care": [
+            "Drink water", "Take a warm shower", "Listen to calm music",
+            "Write in a journal", "Do gentle stretching", "Call a friend"
+        ]
+    }
+}
+
+# Encoded once at import; the backend polls this on every triage
+RESOURCE_RESPONSES = {
+    language: StaticJSON({"success": True, "resources": resources}, headers={"Content-Language": language})
+    for language, resources in RESOURCES.items()
+}
+
+# Aggregates behind /mental-health/mood/trends, keyed on the moods above
+mood_trends = MoodTrendIndex(MOOD_INTERVENTIONS, max_users=config.MOOD_TRENDS_MAX_USERS)
+
+@router.post("/mental-health/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def mental_health_chat(input_data: ChatInput, stream: bool = False):
+    """Trauma-informed mental health chat
+
+    With ?stream=true the reply is sent as Server-Sent Events while the model
+    is still generating it.
+    """
+    try:
+        # Crisis and sensitive-topic detection in one pass
+        with CRISIS_CHECK_SECONDS.time("chat"):
+            detected = detector.scan(input_data.text)
+        is_crisis = CRISIS in detected
+        
+        if is_crisis:
+            CRISIS_DETECTIONS.inc("chat")
+            if stream:
+                return sse_response(single_event_stream("crisis", CRISIS_RESPONSE))
+            return Response(CRISIS_RESPONSE_BODY, media_type="application/json")
+        
+        if stream:
+            return sse_response(stream_trauma_informed_response(
+                input_data.text, input_data.language, detected, input_data.user_id
+            ))
+        
+        # Get trauma-informed AI response (crisis messages returned above, so
+        # they never reach the response cache)
+        ai_response = await get_trauma_informed_response(
+            input_data.text, input_data.language, detected, input_data.user_id
+        )
+        
+        return ChatResponse(
+            success=True,
+            response=ai_response,
+            crisis_detected=False,
+            support_resources=SUPPORT_RESOURCES
+        )
+        
+    except Exception as e:
+        FALLBACKS.inc("chat_error")
+        return ChatResponse(
+            success=False,
+            response="I'm here to support you. Sometimes I have technical difficulties, but your feelings are always valid. Would you like to try sharing again?",
+            error=str(e)
+        )
+
+@router.post("/mental-health/mood", response_model=MoodResponse)
+async def log_mood(mood_data: MoodInput):
+    """Log mood and provide personalized intervention"""
+    try:
+        with MOOD_SECONDS.time():
+            intervention_data = MOOD_INTERVENTIONS.get(mood_data.emoji, DEFAULT_MOOD_INTERVENTION)
+            
+            # Queue the mood log; the store writes it in the background
+            logged_at = time.time()
+            await mood_store.log(
+                mood_data.user_id,
+                mood_data.emoji,
+                mood_data.notes,
+                intervention_data["intervention"],
+                logged_at
+            )
+            mood_trends.record(mood_data.user_id, mood_data.emoji, logged_at)
+        
+        return MoodResponse(
+            success=True,
+            message=intervention_data["message"],
+            intervention=intervention_data["intervention"],
+            suggested_activities=intervention_data["activities"],
+            mood_logged=True,
+            follow_up="How are you feeling after trying these suggestions?"
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/mental-health/mood/history/{user_id}")
+async def mood_history(
+    user_id: str,
+    since: datetime = None,
+    until: datetime = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Logged moods for a user, newest first, optionally within [since, until)"""
+    try:
+        entries = await mood_store.history(
+            user_id,
+            since.timestamp() if since else None,
+            until.timestamp() if until else None,
+            limit
+        )
+        
+        return {
+            "success": True,
+            "user_id": user_id,
+            "count": len(entries),
+            "entries": [
+                {
+                    "emoji": entry["emoji"],
+                    "notes": entry["notes"],
+                    "timestamp": datetime.fromtimestamp(entry["ts"]).isoformat(),
+                    "intervention_provided": entry["intervention"]
+                }
+                for entry in entries
+            ]
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/mental-health/mood/trends/{user_id}")
+async def mood_trend_summary(user_id: str):
+    """Mood distributions, streaks and transitions over 7, 30 and 90 days"""
+    try:
+        # First query since startup: rebuild this user's buckets once from the
+        # store. Other workers log moods this process never sees, so with
+        # several workers the buckets are rebuilt when older than the refresh
+        # interval; this worker's own logs are applied immediately either way.
+        max_age = config.MOOD_TRENDS_REFRESH_SECONDS if config.WORKERS > 1 else None
+        if not mood_trends.is_hydrated(user_id, max_age):
+            horizon = time.time() - max(TREND_WINDOWS) * 86400
+            
+            async def stored_moods():
+                entries = await mood_store.history(user_id, since=horizon, limit=None)
+                return [(e["emoji"], e["ts"]) for e in reversed(entries)]
+            
+            await mood_trends.reload(user_id, stored_moods)
+        
+        return {
+            "success": True,
+            "user_id": user_id,
+            **mood_trends.trends(user_id)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+PROMPT_HEAD = """You are a trauma-informed, culturally-sensitive mental health chatbot specifically for refugees and displaced people.
+
+CRITICAL GUIDELINES:
+- NEVER ask about their home country, family separation, or trauma details
+- Be gentle, warm, and supportive
+- Focus on present emotions and immediate coping
+- Provide practical, simple mental health techniques
+- Show cultural sensitivity and respect
+- Keep responses concise but caring
+- Emphasize their strength and resilience
+
+"""
+
+PROMPT_TAIL = "\n\nRespond with empathy and practical support. Focus on their current emotional state and immediate wellbeing."
+
+def build_prompt(user_text: str, language: str, history: str = "") -> str:
+    # history is the session's already-rendered turns (see app/conversation.py)
+    if history:
+        return f"{PROMPT_HEAD}Conversation so far:\n{history}\nUser language: {language}\nUser says: {user_text}{PROMPT_TAIL}"
+    return f"{PROMPT_HEAD}User language: {language}\nUser says: {user_text}{PROMPT_TAIL}"
+
+def gemini_request(user_text: str, language: str, history: str = ""):
+    headers = {
+        "Content-Type": "application/json",
+        "x-goog-api-key": config.GEMINI_API_KEY,
+    }
+    
+    payload = {
+        "contents": [{"parts": [{"text": build_prompt(user_text, language, history)}]}]
+    }
+    return payload, headers
+
+def extract_text(data: dict) -> str:
+    return data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+
+async def get_trauma_informed_response(user_text: str, language: str = "en", detected=None,
+                                       user_id: str = ANONYMOUS_USER):
+    """Get trauma-informed response from Gemini AI, with the user's recent turns as context"""
+    try:
+        # Filter sensitive content (reuse the caller's scan when given)
+        if detected is None:
+            detected = detector.scan(user_text)
+        if PROHIBITED_TOPIC in detected:
+            FALLBACKS.inc("sensitive_topic")
+            return SENSITIVE_TOPIC_RESPONSE
+        
+        # Replies that depend on earlier turns are neither cached nor served from cache
+        history = conversations.context(user_id)
+        cache_key = None if history else response_cache.key(user_text, language)
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            conversations.append(user_id, user_text, cached)
+            return cached
+        
+        if not config.GEMINI_API_KEY:
+            # Nothing to call: answer locally, leaving the dispatcher and its breaker alone
+            return offline_response(user_text, language, "not_configured")
+        
+        payload, headers = gemini_request(user_text, language, history)
+        # Identical prompts in flight share one upstream call
+        coalesce_key = payload["contents"][0]["parts"][0]["text"]
+        with GEMINI_SECONDS.time("buffered"):
+            data = await llm_dispatcher.call(
+                coalesce_key,
+                lambda: http_client.post_json(GEMINI_API_URL, payload, headers),
+            )
+        
+        ai_text = extract_text(data)
+        
+        if not ai_text:
+            FALLBACKS.inc("empty_reply")
+            return EMPTY_REPLY_RESPONSE
+        
+        response_cache.put(cache_key, ai_text)
+        conversations.append(user_id, user_text, ai_text)
+        return ai_text
+            
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(type(e).__name__)
+        return offline_response(user_text, language)
+
+def offline_response(user_text: str, language: str, reason: str = "upstream_error") -> str:
+    """Reply for when Gemini is unreachable: the offline engine's, else the canned one.
+
+    Once the dispatcher's circuit breaker opens, calls fail without touching
+    the network, so this path answers in milliseconds.
+    """
+    reply = offline_engine.respond(user_text, language)
+    if reply is not None:
+        FALLBACKS.inc("offline_engine")
+        return reply
+    FALLBACKS.inc(reason)
+    return UPSTREAM_ERROR_RESPONSE
+
+def sse_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def single_event_stream(event: str, data):
+    yield sse_event(event, data)
+    yield sse_event("done", {"success": True})
+
+async def stream_trauma_informed_response(user_text: str, language: str = "en", detected=None,
+                                          user_id: str = ANONYMOUS_USER):
+    """Streaming counterpart of get_trauma_informed_response.
+
+    Yields SSE "message" events carrying text chunks as they arrive from the
+    model, then a "done" event. Sensitive topics and cache hits are sent as a
+    single chunk; an upstream failure ends the stream with the usual fallback.
+    """
+    if detected is None:
+        detected = detector.scan(user_text)
+    done = {"success": True, "crisis_detected": False, "support_resources": SUPPORT_RESOURCES}
+    
+    if PROHIBITED_TOPIC in detected:
+        FALLBACKS.inc("sensitive_topic")
+        yield sse_event("message", {"text": SENSITIVE_TOPIC_RESPONSE})
+        yield sse_event("done", done)
+        return
+    
+    history = conversations.context(user_id)
+    cache_key = None if history else response_cache.key(user_text, language)
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        conversations.append(user_id, user_text, cached)
+        yield sse_event("message", {"text": cached})
+        yield sse_event("done", done)
+        return
+    
+    if not config.GEMINI_API_KEY:
+        yield sse_event("message", {"text": offline_response(user_text, language, "not_configured")})
+        yield sse_event("done", dict(done, success=False))
+        return
+    
+    chunks = []
+    try:
+        payload, headers = gemini_request(user_text, language, history)
+        # Time only the dispatcher wait and the upstream reads: the clock
+        # stops while a chunk is handed to the client, so slow readers
+        # don't inflate the metric
+        upstream = 0.0
+        resumed = time.perf_counter()
+        try:
+            async with llm_dispatcher.slot():
+                async for data in http_client.stream_sse(GEMINI_STREAM_URL, payload, headers):
+                    upstream += time.perf_counter() - resumed
+                    resumed = None
+                    text = extract_text(data)
+                    if text:
+                        chunks.append(text)
+                        yield sse_event("message", {"text": text})
+                    resumed = time.perf_counter()
+        finally:
+            if resumed is not None:
+                upstream += time.perf_counter() - resumed
+            GEMINI_SECONDS.observe(upstream, "stream")
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(type(e).__name__)
+        if not chunks:
+            yield sse_event("message", {"text": offline_response(user_text, language)})
+        yield sse_event("done", dict(done, success=False))
+        return
+    
+    if chunks:
+        reply = "".join(chunks)
+        response_cache.put(cache_key, reply)
+        conversations.append(user_id, user_text, reply)
+    else:
+        FALLBACKS.inc("empty_reply")
+        yield sse_event("message", {"text": EMPTY_REPLY_RESPONSE})
+    yield sse_event("done", done)
+
+@router.get("/mental-health/resources")
+async def get_resources(request: Request, language: str = "en"):
+    """Get mental health resources (pre-encoded; ETag revalidates to 304)"""
+    return RESOURCE_RESPONSES.get(language, RESOURCE_RESPONSES["en"]).response(request)
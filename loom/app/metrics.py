@@ -0,0 +1,29 @@
+from app import config  # noqa: F401  (puts common/ on sys.path)
+from common.metrics import CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
+
+metrics = MetricsRegistry()
+
+CRISIS_CHECK_SECONDS = metrics.histogram(
+    "loom_crisis_check_seconds", "Crisis and sensitive-topic scan time", ("source",)
+)
+GEMINI_SECONDS = metrics.histogram(
+    "loom_gemini_request_seconds", "Gemini round trip time, including dispatcher wait", ("mode",)
+)
+MOOD_SECONDS = metrics.histogram(
+    "loom_mood_log_seconds", "Mood logging time (queueing and trend update)"
+)
+CRISIS_DETECTIONS = metrics.counter(
+    "loom_crisis_detections_total", "Messages flagged as crisis", ("source",)
+)
+FALLBACKS = metrics.counter(
+    "loom_fallback_responses_total", "Canned or offline-engine replies sent instead of a Gemini reply", ("reason",)
+)
+UPSTREAM_ERRORS = metrics.counter(
+    "loom_upstream_errors_total", "Failed Gemini calls by exception type", ("error",)
+)
+
+__all__ = [
+    "CONTENT_TYPE", "MetricsMiddleware", "metrics",
+    "CRISIS_CHECK_SECONDS", "GEMINI_SECONDS", "MOOD_SECONDS",
+    "CRISIS_DETECTIONS", "FALLBACKS", "UPSTREAM_ERRORS",
+]
@@ -1,10 +1,12 @@
+import time
+
 from fastapi import APIRouter
-from pydantic import BaseModel
 
-router = APIRouter()
+from app.mental_health import mood_trends
+from app.mood_store import mood_store
+from app.schemas.request_models import MoodInput
 
-class MoodInput(BaseModel):
-    emoji: str
+router = APIRouter()
 
 MOOD_INTERVENTIONS = {
     "😀": "Keep up your great mood! Maybe try journaling today.",
@@ -15,6 +17,9 @@ MOOD_INTERVENTIONS = {
 
 @router.post("/log")
 async def log_mood(mood: MoodInput):
+    """Quick mood log; stored and aggregated like /mental-health/mood"""
     suggestion = MOOD_INTERVENTIONS.get(mood.emoji, "Would you like a guided meditation?")
-    # Store mood logs in real deployment
+    logged_at = time.time()
+    await mood_store.log(mood.user_id, mood.emoji, mood.notes, suggestion, logged_at)
+    mood_trends.record(mood.user_id, mood.emoji, logged_at)
     return {"message": "Mood recorded", "intervention": suggestion}
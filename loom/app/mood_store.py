@@ -0,0 +1,187 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from app import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_logs (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    emoji TEXT NOT NULL,
+    notes TEXT NOT NULL,
+    ts REAL NOT NULL,
+    intervention TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mood_logs_user_ts ON mood_logs (user_id, ts);
+"""
+
+_COLUMNS = ("user_id", "emoji", "notes", "ts", "intervention")
+
+
+class MoodStore:
+    """Write-behind mood log store on SQLite (WAL mode).
+
+    log() only enqueues; a background task drains the queue in batches of
+    up to batch_size rows (or every flush_interval seconds) and writes them
+    in one transaction on a worker thread, so request handlers never wait
+    on disk. A batch stays held until its transaction commits, so a failed
+    insert is retried rather than lost. Reads flush pending rows first and
+    use the (user_id, ts) index.
+    stop() lets the writer finish its current batch and drain the queue
+    before the connection is closed.
+    """
+
+    def __init__(self, path, batch_size, flush_interval, queue_size):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._has_rows = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._conn = None
+        self._task = None
+        self._write_lock = asyncio.Lock()
+        self._batch = []
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+    def _open(self):
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    async def _ensure_open(self):
+        if self._conn is None:
+            self._conn = await asyncio.to_thread(self._open)
+
+    async def start(self):
+        await self._ensure_open()
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        if self._task is not None:
+            # Wake the writer and let it drain; cancelling it could leave an
+            # insert running on its thread while the connection closes
+            self._stopping.set()
+            self._has_rows.set()
+            await self._task
+            self._task = None
+        if self._conn is not None:
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                lost = len(self._batch) + self._queue.qsize()
+                print(f"⚠️ Mood store flush on shutdown failed, {lost} entries lost: {e}")
+            async with self._write_lock:
+                await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    async def log(self, user_id, emoji, notes, intervention, ts=None):
+        """Queue one mood entry; only waits if the queue is full"""
+        await self._queue.put((user_id, emoji, notes, time.time() if ts is None else ts, intervention))
+        self._has_rows.set()
+
+    def _drain(self):
+        rows = []
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return rows
+
+    def _insert(self, rows):
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO mood_logs ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    async def _write(self):
+        """Insert the held batch (drained from the queue if empty); it stays held if the insert fails"""
+        async with self._write_lock:
+            if not self._batch:
+                self._batch = self._drain()
+            if not self._batch:
+                return
+            try:
+                await asyncio.to_thread(self._insert, self._batch)
+            except sqlite3.Error:
+                self.errors += 1
+                raise
+            self.written += len(self._batch)
+            self.batches += 1
+            self._batch = []
+
+    async def _pause(self, seconds):
+        """Sleep for seconds, or until stop() is called"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _writer(self):
+        while not self._stopping.is_set():
+            await self._has_rows.wait()
+            # Rows stay queued (visible to flush) until a batch is drained
+            if self.flush_interval > 0 and self._queue.qsize() < self.batch_size:
+                await self._pause(self.flush_interval)
+            self._has_rows.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error:
+                if self._stopping.is_set():
+                    break
+                await self._pause(self.flush_interval)
+                self._has_rows.set()
+
+    async def flush(self):
+        """Write everything queued so far"""
+        await self._ensure_open()
+        while self._batch or not self._queue.empty():
+            await self._write()
+
+    async def history(self, user_id, since=None, until=None, limit=100):
+        """Entries for user_id with since <= ts < until, newest first (limit=None for all)"""
+        await self.flush()
+        query = f"SELECT {', '.join(_COLUMNS)} FROM mood_logs WHERE user_id = ?"
+        params = [user_id]
+        if since is not None:
+            query += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND ts < ?"
+            params.append(until)
+        query += " ORDER BY ts DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        async with self._write_lock:
+            rows = await asyncio.to_thread(lambda: self._conn.execute(query, params).fetchall())
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "pending": len(self._batch),
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+
+mood_store = MoodStore(
+    path=config.MOOD_DB_PATH,
+    batch_size=config.MOOD_BATCH_SIZE,
+    flush_interval=config.MOOD_FLUSH_INTERVAL,
+    queue_size=config.MOOD_QUEUE_SIZE,
+)
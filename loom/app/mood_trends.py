@@ -0,0 +1,194 @@
+import time
+from collections import Counter, OrderedDict
+from datetime import date, datetime
+
+TREND_WINDOWS = (7, 30, 90)
+OTHER_MOOD = "other"
+
+
+class _UserMoods:
+    """Daily buckets and running counters for one user.
+
+    ``days`` maps a date ordinal to [per-mood counts, transition counts]
+    where transitions are a flat K*K list indexed ``from * K + to``.
+    """
+
+    __slots__ = ("days", "last_mood", "last_ts", "mood_streak", "hydrated_at")
+
+    def __init__(self):
+        self.days = {}
+        self.last_mood = None
+        self.last_ts = None
+        self.mood_streak = 0
+        self.hydrated_at = None
+
+
+class MoodTrendIndex:
+    """Per-user mood aggregates updated on every log.
+
+    Each log touches one daily bucket and a few counters; trend queries read
+    at most ``horizon_days`` buckets. Aggregates for users who have not been
+    queried since startup are rebuilt once from the mood store; with several
+    workers, callers pass a max_age so they are rebuilt at most that often.
+    Logs recorded while a rebuild is loading are folded into the rebuilt
+    aggregates unless the load already returned them.
+    """
+
+    def __init__(self, moods, horizon_days=max(TREND_WINDOWS), max_users=50000, clock=time.monotonic):
+        self.moods = list(moods) + [OTHER_MOOD]
+        self._index = {mood: i for i, mood in enumerate(self.moods)}
+        self.horizon_days = horizon_days
+        self.max_users = max_users
+        self._clock = clock
+        self._users = OrderedDict()
+        # user_id -> [loads in flight, (emoji, ts) recorded meanwhile]
+        self._loading = {}
+
+    @staticmethod
+    def _day(ts):
+        return date.fromtimestamp(ts).toordinal()
+
+    def _user(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            if len(self._users) >= self.max_users:
+                self._users.popitem(last=False)
+            user = _UserMoods()
+            self._users[user_id] = user
+        else:
+            self._users.move_to_end(user_id)
+        return user
+
+    def _apply(self, user, emoji, ts):
+        k = len(self.moods)
+        mood = self._index.get(emoji, k - 1)
+        day = self._day(ts)
+
+        bucket = user.days.get(day)
+        if bucket is None:
+            bucket = user.days[day] = [[0] * k, [0] * (k * k)]
+            oldest = day - self.horizon_days
+            for stale in [d for d in user.days if d <= oldest]:
+                del user.days[stale]
+
+        bucket[0][mood] += 1
+        if user.last_mood is not None:
+            bucket[1][user.last_mood * k + mood] += 1
+
+        user.mood_streak = user.mood_streak + 1 if mood == user.last_mood else 1
+        user.last_mood = mood
+        user.last_ts = ts
+
+    def record(self, user_id, emoji, ts=None):
+        """Fold one mood log into the user's aggregates"""
+        ts = time.time() if ts is None else ts
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            loading[1].append((emoji, ts))
+        self._apply(self._user(user_id), emoji, ts)
+
+    def is_hydrated(self, user_id, max_age=None):
+        """True if the user was rebuilt from the store (within max_age seconds, when given)"""
+        user = self._users.get(user_id)
+        if user is None or user.hydrated_at is None:
+            return False
+        return max_age is None or self._clock() - user.hydrated_at < max_age
+
+    def hydrate(self, user_id, entries, recorded=()):
+        """Rebuild a user's aggregates from stored (emoji, ts) entries, oldest first.
+
+        ``recorded`` are logs recorded during the load; those missing from
+        entries are merged in by timestamp.
+        """
+        user = _UserMoods()
+        if recorded:
+            stored = Counter(entries)
+            missing = []
+            for entry in recorded:
+                if stored[entry]:
+                    stored[entry] -= 1
+                else:
+                    missing.append(entry)
+            if missing:
+                entries = sorted(list(entries) + missing, key=lambda entry: entry[1])
+        for emoji, ts in entries:
+            self._apply(user, emoji, ts)
+        user.hydrated_at = self._clock()
+        self._users[user_id] = user
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    async def reload(self, user_id, fetch):
+        """Rebuild a user's aggregates from ``await fetch()`` (entries as for hydrate),
+        keeping logs recorded while the fetch is in flight"""
+        loading = self._loading.setdefault(user_id, [0, []])
+        loading[0] += 1
+        try:
+            entries = await fetch()
+        finally:
+            loading[0] -= 1
+            if not loading[0]:
+                del self._loading[user_id]
+        self.hydrate(user_id, entries, loading[1])
+
+    def trends(self, user_id, windows=TREND_WINDOWS, now=None):
+        today = self._day(time.time() if now is None else now)
+        user = self._users.get(user_id)
+        k = len(self.moods)
+        days = user.days if user is not None else {}
+
+        result = {"windows": {}}
+        for window in windows:
+            counts = [0] * k
+            transitions = [0] * (k * k)
+            days_logged = 0
+            longest = run = 0
+            for day in range(today - window + 1, today + 1):
+                bucket = days.get(day)
+                if bucket is None:
+                    run = 0
+                    continue
+                days_logged += 1
+                run += 1
+                longest = max(longest, run)
+                for i, n in enumerate(bucket[0]):
+                    counts[i] += n
+                for i, n in enumerate(bucket[1]):
+                    transitions[i] += n
+
+            total = sum(counts)
+            distribution = {self.moods[i]: n for i, n in enumerate(counts) if n}
+            result["windows"][str(window)] = {
+                "total_logs": total,
+                "days_logged": days_logged,
+                "longest_logging_streak_days": longest,
+                "distribution": distribution,
+                "distribution_pct": {m: round(100 * n / total, 1) for m, n in distribution.items()},
+                "dominant_mood": max(distribution, key=distribution.get) if distribution else None,
+                "transitions": sorted(
+                    (
+                        {"from": self.moods[i // k], "to": self.moods[i % k], "count": n}
+                        for i, n in enumerate(transitions) if n
+                    ),
+                    key=lambda t: t["count"],
+                    reverse=True,
+                ),
+            }
+
+        streak = 0
+        day = today
+        while day in days:
+            streak += 1
+            day -= 1
+
+        result["current_logging_streak_days"] = streak
+        result["current_mood_streak"] = (
+            {"mood": self.moods[user.last_mood], "count": user.mood_streak}
+            if user is not None and user.last_mood is not None else None
+        )
+        result["last_logged"] = (
+            datetime.fromtimestamp(user.last_ts).isoformat()
+            if user is not None and user.last_ts is not None else None
+        )
+        return result
@@ -1,38 +1,28 @@
-import httpx
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
-
-async def get_gemini_response(user_text: str, user_lang: str) -> str:
-    prompt = {
-        "contents": [{
-            "parts": [{
-                "text": f"You are a trauma-informed, culturally-sensitive mental health chatbot for refugees.\nUser language: {user_lang}\nUser says: {user_text}"
-            }]
-        }]
-    }
-    headers = {
-        "Authorization": f"Bearer {GEMINI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(GEMINI_API_URL, json=prompt, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
 from app.schemas.request_models import ChatInput
-from app.chatbot import get_gemini_response  # or from app.nlp if you placed the function there
+from app.detector import detector, CRISIS
+from app.mental_health import CRISIS_RESPONSE, get_trauma_informed_response
+from app.metrics import CRISIS_CHECK_SECONDS, CRISIS_DETECTIONS
 
 router = APIRouter()
 
 @router.post("/")
 async def chat_endpoint(inp: ChatInput):
-    try:
-        raw_response = await get_gemini_response(inp.text, inp.language)
-        return {"response": raw_response}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Plain chat reply, screened exactly like /mental-health/chat.
+
+    Crisis messages get the crisis response and never reach the model;
+    sensitive topics, caching and the offline fallback are handled by
+    get_trauma_informed_response, which never raises.
+    """
+    with CRISIS_CHECK_SECONDS.time("plain_chat"):
+        detected = detector.scan(inp.text)
+    if CRISIS in detected:
+        CRISIS_DETECTIONS.inc("plain_chat")
+        return {
+            "response": CRISIS_RESPONSE["response"],
+            "crisis_detected": True,
+            "emergency_contacts": CRISIS_RESPONSE["emergency_contacts"],
+        }
+
+    response = await get_trauma_informed_response(inp.text, inp.language, detected, inp.user_id)
+    return {"response": response, "crisis_detected": False}
@@ -0,0 +1,80 @@
+"""Text normalization shared by crisis detection, the topic filter, cache keys and the offline engine.
+
+Arabic and Dari messages arrive with diacritics, tatweel, zero-width and
+bidi controls, presentation forms and several spellings of the same
+letter; fold() maps all of them onto one form so a keyword list only
+has to spell each phrase once.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from app import config
+
+_TOKEN = re.compile(r"\w+")
+# Longer texts are folded on every call rather than pinned in the memo
+MEMO_MAX_CHARS = 8192
+
+# Characters fold() drops (after NFKD has split marks off their base letters)
+_DROPPED = [
+    *range(0x0300, 0x0370),   # Latin/Greek/Cyrillic combining diacritics
+    *range(0x0610, 0x061B),   # Arabic honorific and Quranic signs
+    *range(0x064B, 0x0660),   # harakat, shadda, sukun, hamza above/below, maddah
+    0x0670,                   # superscript alef
+    *range(0x06D6, 0x06DD), *range(0x06DF, 0x06E5), 0x06E7, 0x06E8, *range(0x06EA, 0x06EE),
+    0x0640,                   # tatweel
+    *range(0x200B, 0x2010),   # zero-width space/non-joiner/joiner, LRM, RLM
+    *range(0x202A, 0x202F), *range(0x2066, 0x206A), 0x061C, 0xFEFF,
+]
+
+# Letters with several spellings in Arabic and Persian keyboards, mapped to one
+_VARIANTS = {
+    "ٱ": "ا",       # alef wasla -> alef (hamza/madda alefs reduce to alef via NFKD)
+    "ى": "ي",       # alef maksura -> yeh
+    "ی": "ي",       # Farsi yeh -> yeh
+    "ک": "ك",       # keheh -> kaf
+    "ة": "ه",       # teh marbuta -> heh
+    "ە": "ه",       # ae -> heh
+    "‘": "'", "’": "'", "ʼ": "'", "“": '"', "”": '"',
+}
+_VARIANTS.update({chr(0x0660 + d): str(d) for d in range(10)})   # Arabic-Indic digits
+_VARIANTS.update({chr(0x06F0 + d): str(d) for d in range(10)})   # Extended (Persian) digits
+
+_FOLD_TABLE = str.maketrans({**dict.fromkeys(map(chr, _DROPPED)), **_VARIANTS})
+
+
+def fold(text: str) -> str:
+    """Compatibility-folded (NFKC), caseless text without diacritics or letter variants"""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text).translate(_FOLD_TABLE)
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+@lru_cache(maxsize=config.NORMALIZE_CACHE_SIZE)
+def _normalize(text):
+    return fold(text)
+
+
+@lru_cache(maxsize=config.NORMALIZE_CACHE_SIZE)
+def _tokens(text):
+    return tuple(_TOKEN.findall(_normalize(text)))
+
+
+def normalize(text: str) -> str:
+    """fold(), memoized so a message is folded once however many stages look at it"""
+    if len(text) > MEMO_MAX_CHARS:
+        return fold(text)
+    return _normalize(text)
+
+
+def tokens(text: str) -> tuple:
+    """Words of the normalized text"""
+    if len(text) > MEMO_MAX_CHARS:
+        return tuple(_TOKEN.findall(fold(text)))
+    return _tokens(text)
+
+
+def stats():
+    info = _normalize.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize, "max_entries": info.maxsize}
@@ -0,0 +1,225 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app import config
+from app.normalization import tokens
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalized words of the prompt, without punctuation, single-spaced"""
+    return " ".join(tokens(text))
+
+
+class SharedCacheTier:
+    """Second cache level in SQLite, shared by every worker process.
+
+    Entries carry a wall-clock expiry. Expired rows are swept, and the
+    table is trimmed to max_entries, once every sweep_every writes.
+
+    All SQLite work runs on one dedicated thread that owns the connection:
+    get() is awaited, put() is queued and not waited for. Writes beyond
+    max_pending queued ones, and writes that fail (e.g. the database stayed
+    locked past the busy timeout), are dropped and counted; the local tier
+    already holds the entry.
+    """
+
+    def __init__(self, path, ttl, max_entries, sweep_every=256, max_pending=256):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_every = sweep_every
+        self.max_pending = max_pending
+        self._conn = None
+        self._writes = 0
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="shared-cache")
+        self.dropped = 0
+        self.errors = 0
+
+    @property
+    def conn(self):
+        # Opened lazily so each worker process gets its own connection
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key):
+        row = self.conn.execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        remaining = row[1] - time.time()
+        return (row[0], remaining) if remaining > 0 else None
+
+    async def get(self, key):
+        """(value, seconds left) or None"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._get, key)
+
+    def _put(self, key, value):
+        try:
+            self._write(key, value)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _written(self, future):
+        self._pending -= 1
+
+    def put(self, key, value):
+        """Queue a write on the cache thread; call from the event loop"""
+        if self._pending >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending += 1
+        # The done callback runs on the loop, so only the loop touches _pending
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._put, key, value)
+        future.add_done_callback(self._written)
+
+    def _write(self, key, value):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)", (key, value, now + self.ttl)
+        )
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            self.conn.execute(
+                "DELETE FROM response_cache WHERE key IN "
+                "(SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+class ResponseCache:
+    """LRU cache of model replies with a TTL and a byte budget.
+
+    Entries are keyed on (language, normalized text). Only short prompts are
+    cached since long messages are effectively unique. With a shared tier,
+    local misses fall through to it and writes go to both, so a reply
+    fetched by one worker process is reused by the others.
+    """
+
+    def __init__(self, ttl, max_entries, max_bytes, max_prompt_chars, clock=time.monotonic, shared=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_prompt_chars = max_prompt_chars
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, text: str, language: str):
+        """Cache key for a prompt, or None if it should not be cached"""
+        if len(text) > self.max_prompt_chars:
+            return None
+        normalized = normalize_prompt(text)
+        if not normalized:
+            return None
+        return f"{language.lower()}\x00{normalized}"
+
+    async def get(self, key):
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self._get_shared(key)
+        expires_at, value, size = entry
+        if expires_at <= self._clock():
+            self._remove(key, size)
+            self.expirations += 1
+            return await self._get_shared(key)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def _get_shared(self, key):
+        found = None
+        if self.shared is not None:
+            try:
+                found = await self.shared.get(key)
+            except sqlite3.Error:
+                found = None
+        if found is None:
+            self.misses += 1
+            return None
+        value, remaining = found
+        self._put_local(key, value, remaining)
+        self.shared_hits += 1
+        self.hits += 1
+        return value
+
+    def put(self, key, value: str):
+        if key is None:
+            return
+        self._put_local(key, value, self.ttl)
+        if self.shared is not None:
+            self.shared.put(key, value)
+
+    def _put_local(self, key, value, ttl):
+        size = len(key.encode()) + len(value.encode())
+        if size > self.max_bytes:
+            return
+        old = self._entries.get(key)
+        if old is not None:
+            self._remove(key, old[2])
+        self._entries[key] = (self._clock() + ttl, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            old_key, (_, _, old_size) = next(iter(self._entries.items()))
+            self._remove(old_key, old_size)
+            self.evictions += 1
+
+    def _remove(self, key, size):
+        del self._entries[key]
+        self._bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "shared_writes_dropped": self.shared.dropped if self.shared is not None else None,
+            "shared_errors": self.shared.errors if self.shared is not None else None,
+        }
+
+
+response_cache = ResponseCache(
+    ttl=config.CACHE_TTL_SECONDS,
+    max_entries=config.CACHE_MAX_ENTRIES,
+    max_bytes=config.CACHE_MAX_BYTES,
+    max_prompt_chars=config.CACHE_MAX_PROMPT_CHARS,
+    shared=SharedCacheTier(
+        config.SHARED_STATE_PATH,
+        ttl=config.CACHE_TTL_SECONDS,
+        max_entries=config.CACHE_MAX_ENTRIES * config.WORKERS,
+    ) if config.SHARED_STATE_PATH else None,
+)
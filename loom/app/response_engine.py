@@ -0,0 +1,279 @@
+"""Chat reply engines used when the Gemini upstream is unreachable.
+
+    python -m app.response_engine          # (re)build the offline index
+"""
+import asyncio
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import time
+from collections import Counter
+
+from app import config
+from app.normalization import tokens
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+INDEX_VERSION = 2
+
+
+def _terms(text):
+    """Unigrams and adjacent-word bigrams of the normalized text"""
+    words = tokens(text)
+    return [*words, *(f"{a} {b}" for a, b in zip(words, words[1:]))]
+
+
+class ResponseEngine:
+    """A source of chat replies that needs no network.
+
+    respond() returns a reply or None when the engine has nothing to offer,
+    in which case the caller falls back to its canned message.
+    """
+
+    name = "none"
+
+    def load(self):
+        """Do any setup synchronously, for scripts and benchmarks"""
+
+    def warm_up(self):
+        """Start any slow setup in the background; called at app startup"""
+
+    def respond(self, text: str, language: str):
+        return None
+
+    def stats(self):
+        return {"engine": self.name}
+
+
+class LocalRetrievalEngine(ResponseEngine):
+    """Nearest vetted coping response by TF-IDF cosine similarity.
+
+    The corpus (app/coping_responses.json) is compiled once into an index
+    directory: meta.json with the vocabulary, IDF weights and responses,
+    and matrix.npy with one L2-normalized row per example pattern, grouped
+    by language. The matrix is memory-mapped read-only, so every worker
+    process shares the same page-cache copy; the index is rebuilt when the
+    corpus changes.
+
+    Loading (numpy import, index build or mmap) runs on a worker thread,
+    started by warm_up() at startup, so it never stalls the event loop.
+    Until it finishes respond() returns None. A failed load is retried on
+    a later respond() after a backoff that doubles up to max_backoff.
+    """
+
+    name = "local"
+
+    def __init__(self, corpus_path, index_dir, min_score=0.1, default_language="en",
+                 backoff=1.0, max_backoff=300.0, clock=time.monotonic):
+        self.corpus_path = corpus_path
+        self.index_dir = index_dir
+        self.min_score = min_score
+        self.default_language = default_language
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._index = None
+        self._load_task = None
+        self._failures = 0
+        self._retry_at = None
+        self.error = None if NUMPY_AVAILABLE else "numpy is not installed"
+        self.load_seconds = None
+        self.replies = 0
+        self.defaults = 0
+
+    def _corpus_digest(self):
+        with open(self.corpus_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def build(self):
+        """Compile the corpus into index_dir; safe to run from several processes at once"""
+        import numpy as np
+
+        with open(self.corpus_path, "rb") as f:
+            raw = f.read()
+        corpus = json.loads(raw)
+        default_intent = corpus["default_intent"]
+
+        entries = sorted(corpus["entries"], key=lambda e: e["language"])
+        rows = []
+        languages = {}
+        defaults = {}
+        for i, entry in enumerate(entries):
+            if entry["intent"] == default_intent:
+                defaults[entry["language"]] = i
+            for pattern in entry["patterns"]:
+                span = languages.setdefault(entry["language"], [len(rows), len(rows)])
+                span[1] += 1
+                rows.append((i, Counter(_terms(pattern))))
+
+        vocabulary = {}
+        document_frequency = Counter()
+        for _, counts in rows:
+            for term in counts:
+                vocabulary.setdefault(term, len(vocabulary))
+                document_frequency[term] += 1
+        idf = [0.0] * len(vocabulary)
+        for term, column in vocabulary.items():
+            idf[column] = math.log((1 + len(rows)) / (1 + document_frequency[term])) + 1
+
+        matrix = np.zeros((len(rows), len(vocabulary)), dtype=np.float32)
+        for r, (_, counts) in enumerate(rows):
+            for term, count in counts.items():
+                column = vocabulary[term]
+                matrix[r, column] = (1 + math.log(count)) * idf[column]
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        meta = {
+            "version": INDEX_VERSION,
+            "corpus_sha256": hashlib.sha256(raw).hexdigest(),
+            "vocabulary": vocabulary,
+            "idf": idf,
+            "languages": languages,
+            "defaults": defaults,
+            "row_entries": [i for i, _ in rows],
+            "responses": [entry["response"] for entry in entries],
+            "intents": [entry["intent"] for entry in entries],
+        }
+
+        # Unique temp names, then atomic renames; meta.json goes last
+        os.makedirs(self.index_dir, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        matrix_path = os.path.join(self.index_dir, "matrix.npy")
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        with open(matrix_path + suffix, "wb") as f:
+            np.save(f, matrix)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(matrix_path + suffix, matrix_path)
+        os.replace(meta_path + suffix, meta_path)
+        return meta
+
+    def _load(self):
+        import numpy as np
+
+        started = time.perf_counter()
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta is None or meta.get("version") != INDEX_VERSION or meta["corpus_sha256"] != self._corpus_digest():
+            meta = self.build()
+
+        matrix = np.load(os.path.join(self.index_dir, "matrix.npy"), mmap_mode="r")
+        if matrix.shape != (len(meta["row_entries"]), len(meta["vocabulary"])):
+            meta = self.build()
+            matrix = np.load(os.path.join(self.index_dir, "matrix.npy"), mmap_mode="r")
+
+        meta["idf"] = np.asarray(meta["idf"], dtype=np.float32)
+        meta["matrix"] = matrix
+        self._index = meta
+        self.load_seconds = time.perf_counter() - started
+
+    def load(self):
+        """Load synchronously, for scripts and benchmarks; raises on failure"""
+        self._load()
+        self.error = None
+
+    async def _load_in_background(self):
+        try:
+            await asyncio.to_thread(self._load)
+        except Exception as e:
+            self._failures += 1
+            delay = min(self.backoff * 2 ** (self._failures - 1), self.max_backoff)
+            self._retry_at = self._clock() + delay
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Offline response index failed to load, retrying in {delay:.0f}s: {self.error}")
+        else:
+            self._failures = 0
+            self._retry_at = None
+            self.error = None
+        finally:
+            self._load_task = None
+
+    def warm_up(self):
+        """Start loading on a worker thread unless loaded, loading or backing off"""
+        if self._index is not None or self._load_task is not None or not NUMPY_AVAILABLE:
+            return
+        if self._retry_at is not None and self._clock() < self._retry_at:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._load_task = loop.create_task(self._load_in_background())
+
+    def respond(self, text: str, language: str):
+        if self._index is None:
+            self.warm_up()
+            return None
+        import numpy as np
+
+        index = self._index
+        if language not in index["languages"]:
+            language = self.default_language
+        span = index["languages"].get(language)
+        if span is None:
+            return None
+        start, stop = span
+
+        vocabulary = index["vocabulary"]
+        counts = Counter(term for term in _terms(text) if term in vocabulary)
+        entry = index["defaults"].get(language)
+        if counts:
+            columns = [vocabulary[term] for term in counts]
+            weights = np.fromiter((1 + math.log(n) for n in counts.values()), np.float32, len(counts))
+            weights *= index["idf"][columns]
+            weights /= np.linalg.norm(weights)
+            # Only the query's columns of this language's rows are read
+            scores = index["matrix"][start:stop, columns] @ weights
+            best = int(scores.argmax())
+            if scores[best] >= self.min_score:
+                entry = index["row_entries"][start + best]
+
+        if entry is None:
+            return None
+        self.replies += 1
+        if entry == index["defaults"].get(language):
+            self.defaults += 1
+        return index["responses"][entry]
+
+    def stats(self):
+        return {
+            "engine": self.name,
+            "loaded": self._index is not None,
+            "load_ms": round(self.load_seconds * 1000, 2) if self.load_seconds is not None else None,
+            "patterns": len(self._index["row_entries"]) if self._index is not None else None,
+            "replies": self.replies,
+            "default_replies": self.defaults,
+            "loading": self._load_task is not None,
+            "failed_loads": self._failures,
+            "error": self.error,
+        }
+
+
+ENGINES = {
+    ResponseEngine.name: ResponseEngine,
+    LocalRetrievalEngine.name: lambda: LocalRetrievalEngine(
+        config.OFFLINE_CORPUS_PATH,
+        config.OFFLINE_INDEX_DIR,
+        min_score=config.OFFLINE_MIN_SCORE,
+    ),
+}
+
+
+def build_engine(name: str) -> ResponseEngine:
+    if name not in ENGINES:
+        raise ValueError(f"unknown response engine {name!r}; choose from {sorted(ENGINES)}")
+    return ENGINES[name]()
+
+
+offline_engine = build_engine(config.OFFLINE_ENGINE)
+
+
+if __name__ == "__main__":
+    engine = build_engine(LocalRetrievalEngine.name)
+    meta = engine.build()
+    print(f"Built {engine.index_dir}: {len(meta['row_entries'])} patterns, {len(meta['vocabulary'])} terms")
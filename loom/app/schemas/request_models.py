@@ -1,5 +1,25 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
 
 class ChatInput(BaseModel):
+    """Chat message; language is normalized once here (lowercase, "en" if blank)"""
+
     text: str
-    language: str
+    language: str = "en"
+    user_id: str = "anonymous"
+
+    @field_validator("language")
+    @classmethod
+    def _language(cls, value):
+        return value.strip().lower() or "en"
+
+
+class MoodInput(BaseModel):
+    emoji: str
+    user_id: str = "anonymous"
+    notes: str = ""
+
+    @field_validator("emoji")
+    @classmethod
+    def _emoji(cls, value):
+        return value.strip()
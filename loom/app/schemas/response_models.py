@@ -0,0 +1,22 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class ChatResponse(BaseModel):
+    """/mental-health/chat reply; unset fields are left out of the JSON"""
+
+    success: bool
+    response: str
+    crisis_detected: Optional[bool] = None
+    support_resources: Optional[List[str]] = None
+    error: Optional[str] = None
+
+
+class MoodResponse(BaseModel):
+    success: bool
+    message: str
+    intervention: str
+    suggested_activities: List[str]
+    mood_logged: bool
+    follow_up: str
@@ -1,7 +1,6 @@
-PROHIBITED_TOPICS = ["country", "family", "parents", "motherland"]
+from app.detector import detector, PROHIBITED_TOPIC
 
 def filter_sensitive_content(text: str) -> str:
-    lowered = text.lower()
-    if any(topic in lowered for topic in PROHIBITED_TOPICS):
+    if PROHIBITED_TOPIC in detector.scan(text):
         return "Let's focus on your current feelings. How can I best support you today?"
     return text
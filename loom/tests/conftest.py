@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+# Tests import the app the way the service runs it: from loom/, with the
+# repository root (common/) importable; state goes to a scratch directory
+LOOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if LOOM_DIR not in sys.path:
+    sys.path.insert(0, LOOM_DIR)
+
+_TMP = tempfile.mkdtemp(prefix="loom-tests-")
+os.environ.setdefault("LOOM_MOOD_DB_PATH", os.path.join(_TMP, "mood_logs.db"))
+os.environ.setdefault("LOOM_OFFLINE_INDEX_DIR", os.path.join(_TMP, "offline_index"))
+
+
+def gemini_reply(text):
+    """Body of a generateContent reply (or one streamed chunk) carrying text"""
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+class StubUpstream:
+    """Scripted HTTP/1.1 server on 127.0.0.1, run on its own thread and loop.
+
+    Each request takes the next queued reply (200 with an empty JSON body
+    once the script runs out). A reply is a dict with any of:
+      status, json   status code and JSON body
+      delay          seconds to wait before answering
+      drop           close the connection without answering
+      sse            list of JSON events, sent as a chunked text/event-stream
+      chunk_delay    seconds between SSE events
+      drop_after     close the stream after this many events, mid-body
+    Every request is recorded as (path, decoded JSON body).
+    """
+
+    def __init__(self):
+        self.replies = []
+        self.requests = []
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def script(self, *replies):
+        self.replies.extend(replies)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _shutdown(self):
+        self._server.close()
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+                length = int(headers.get("content-length", headers.get("Content-Length", "0")))
+                body = await reader.readexactly(length) if length else b""
+                self.requests.append((lines[0].split(" ")[1], json.loads(body) if body else None))
+
+                reply = self.replies.pop(0) if self.replies else {}
+                if reply.get("delay"):
+                    await asyncio.sleep(reply["delay"])
+                if reply.get("drop"):
+                    return
+                if "sse" in reply:
+                    await self._stream(writer, reply)
+                    return
+                payload = json.dumps(reply.get("json", {})).encode()
+                writer.write(
+                    f"HTTP/1.1 {reply.get('status', 200)} Stub\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _stream(self, writer, reply):
+        writer.write(
+            f"HTTP/1.1 {reply.get('status', 200)} Stub\r\nContent-Type: text/event-stream\r\n"
+            "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n".encode()
+        )
+        for i, event in enumerate(reply["sse"]):
+            if i == reply.get("drop_after"):
+                await writer.drain()
+                return
+            chunk = f"data: {json.dumps(event)}\r\n\r\n".encode()
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            await writer.drain()
+            if reply.get("chunk_delay"):
+                await asyncio.sleep(reply["chunk_delay"])
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+@pytest.fixture
+def stub_upstream():
+    stub = StubUpstream().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def fresh_client():
+    """Each test gets its own pooled client (clients are bound to one event loop)"""
+    from app import http_client
+
+    http_client._client = None
+    http_client._warmup = None
+    yield http_client
+    http_client._client = None
+    http_client._warmup = None
+
+
+@pytest.fixture
+def client(stub_upstream, fresh_client, monkeypatch, tmp_path):
+    """The Loom app with Gemini pointed at the stub upstream"""
+    from fastapi.testclient import TestClient
+
+    from app import config, main, mental_health
+    from app.dispatcher import CircuitBreaker, LLMDispatcher
+    from app.main import create_app
+    from app.mood_store import MoodStore
+    from app.response_cache import response_cache
+
+    # Each TestClient runs its own event loop; give it a store bound to that loop
+    monkeypatch.setattr(main, "mood_store", MoodStore(str(tmp_path / "moods.db"), 256, 0.05, 1000))
+    monkeypatch.setattr(config, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(mental_health, "GEMINI_API_URL", stub_upstream.url + "/generate")
+    monkeypatch.setattr(mental_health, "GEMINI_STREAM_URL", stub_upstream.url + "/stream")
+    monkeypatch.setattr(mental_health, "llm_dispatcher", LLMDispatcher(
+        max_concurrency=4, rate_per_second=100, burst=10, max_queue=10, deadline_seconds=5,
+        breaker=CircuitBreaker(failure_threshold=5, reset_seconds=30),
+    ))
+    response_cache.clear()
+    with TestClient(create_app()) as test_client:
+        yield test_client
+    response_cache.clear()
@@ -0,0 +1,110 @@
+from app.conversation import ANONYMOUS_USER, ConversationStore, estimate_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(clock=None, **kwargs):
+    options = dict(max_turns=10, token_budget=1000, max_turn_chars=200, idle_seconds=60,
+                   max_sessions=100, max_chars=100000)
+    options.update(kwargs)
+    return ConversationStore(clock=clock or FakeClock(), **options)
+
+
+def turn(user_text, reply):
+    return f"User: {user_text}\nAssistant: {reply}\n"
+
+
+def test_context_renders_turns_in_order_and_clips_long_ones():
+    store = make_store(max_turn_chars=10)
+    store.append("u1", "hello   you", "hi")
+    store.append("u1", "a" * 20, "ok")
+    assert store.context("u1") == turn("hello you", "hi") + turn("a" * 9 + "…", "ok")
+    assert store.context("u2") == ""
+
+
+def test_anonymous_users_get_no_context():
+    store = make_store()
+    store.append(ANONYMOUS_USER, "hello", "hi")
+    assert store.context(ANONYMOUS_USER) == ""
+    assert store.stats()["sessions"] == 0
+
+
+def test_oldest_turns_are_trimmed_to_the_token_budget():
+    one = turn("turn 0", "reply")
+    store = make_store(token_budget=2 * estimate_tokens(one))
+    for i in range(4):
+        store.append("u1", f"turn {i}", "reply")
+
+    assert store.context("u1") == turn("turn 2", "reply") + turn("turn 3", "reply")
+    assert store.trimmed_turns == 2
+    assert store.stats()["chars"] == len(store.context("u1"))
+
+
+def test_oldest_turns_are_trimmed_to_max_turns():
+    store = make_store(max_turns=2)
+    for i in range(3):
+        store.append("u1", f"turn {i}", "reply")
+    assert store.context("u1") == turn("turn 1", "reply") + turn("turn 2", "reply")
+
+
+def test_a_turn_over_the_whole_budget_leaves_no_session():
+    store = make_store(token_budget=5)
+    store.append("u1", "a much longer message than the budget allows", "reply")
+    assert store.context("u1") == ""
+    assert store.stats()["sessions"] == 0 and store.stats()["chars"] == 0
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = make_store(clock=clock, idle_seconds=60)
+    store.append("u1", "hello", "hi")
+    clock.now = 30
+    store.append("u2", "hello", "hi")
+    clock.now = 60
+    assert store.context("u1") == ""
+    assert store.context("u2") == turn("hello", "hi")
+    assert store.expirations == 1
+
+    clock.now = 89
+    store.append("u2", "still here", "good")     # refreshes u2
+    clock.now = 140
+    assert store.context("u2") != ""
+
+
+def test_least_recently_used_session_is_evicted():
+    store = make_store(max_sessions=2)
+    store.append("u1", "hello", "hi")
+    store.append("u2", "hello", "hi")
+    store.append("u1", "again", "hi")             # u1 is now the most recent
+    store.append("u3", "hello", "hi")
+
+    assert store.context("u2") == ""
+    assert store.context("u1") and store.context("u3")
+    assert store.evictions == 1
+
+
+def test_total_text_stays_within_the_process_bound():
+    one = turn("hello", "hi")
+    store = make_store(max_chars=3 * len(one))
+    for i in range(10):
+        store.append(f"u{i}", "hello", "hi")
+        assert store.stats()["chars"] <= 3 * len(one)
+
+    assert store.stats()["sessions"] == 3
+    assert [store.context(f"u{i}") == one for i in range(10)] == [False] * 7 + [True] * 3
+    assert store.evictions == 7
+
+
+def test_forget_releases_the_session():
+    store = make_store()
+    store.append("u1", "hello", "hi")
+    store.forget("u1")
+    store.forget("u1")
+    assert store.context("u1") == ""
+    assert store.stats()["chars"] == 0
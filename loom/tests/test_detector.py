@@ -0,0 +1,49 @@
+import pytest
+
+from app.detector import CRISIS, EMERGENCY, PROHIBITED_TOPIC, KeywordDetector, detector
+
+
+@pytest.mark.parametrize("text", [
+    "I want to end it all",
+    "HOPELESSNESS everywhere",
+    "the worthlessness never leaves",
+    "thinking about suicide",
+    "I can’t go on",                      # typographic apostrophe
+    "أُرِيـــدُ أَنْ أَمُوتَ",                   # diacritics and tatweel
+    "والانتحار",                          # و + article
+    "فانتحر",
+    "للانتحار",
+    "وبالانتحار",
+    "انا يائسة",                          # feminine suffix
+    "من می‌خواهم بمیرم",                   # zero-width non-joiner
+    "ﺃﺭﻳﺪ ﺃﻥ ﺃﻣﻮﺕ",                       # presentation forms
+])
+def test_crisis_recall(text):
+    assert CRISIS in detector.scan(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I feel hopeful today",
+    "I can't go online",
+    "I have homework",
+    "لا أملك المال",                       # "I don't have money", not "no hope"
+    "مواطن",
+])
+def test_crisis_precision(text):
+    assert CRISIS not in detector.scan(text)
+
+
+def test_other_categories_stay_whole_word():
+    assert detector.scan("at home") == {PROHIBITED_TOPIC}
+    assert detector.scan("homework") == set()
+    assert detector.scan("في خطر") == {EMERGENCY}
+
+
+def test_matches_report_the_keyword_not_the_inflected_form():
+    assert detector.matches("hopelessness")[CRISIS] == ["hopeless"]
+    assert detector.matches("للانتحار")[CRISIS] == ["انتحار"]
+
+
+def test_longest_match_keeps_contained_categories():
+    custom = KeywordDetector({"a": ["hope"], "b": ["hope less"]})
+    assert custom.scan("hope less") == {"a", "b"}
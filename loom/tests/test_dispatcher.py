@@ -0,0 +1,224 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.dispatcher import (
+    CircuitBreaker, CircuitOpenError, DispatcherOverloaded, DispatchTimeout, LLMDispatcher, TokenBucket,
+)
+from conftest import gemini_reply
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_dispatcher(max_concurrency=4, rate=1000.0, burst=1000, max_queue=100, deadline=5.0,
+                    threshold=3, reset=30.0, clock=time.monotonic):
+    return LLMDispatcher(
+        max_concurrency=max_concurrency, rate_per_second=rate, burst=burst, max_queue=max_queue,
+        deadline_seconds=deadline, breaker=CircuitBreaker(threshold, reset, clock=clock), clock=clock,
+    )
+
+
+class StubCall:
+    """Upstream stand-in that records how many calls overlap"""
+
+    def __init__(self, delay=0.05, result="ok", error=None):
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return self.result
+        finally:
+            self.active -= 1
+
+
+def test_identical_prompts_share_one_upstream_call():
+    dispatcher = make_dispatcher()
+    upstream = StubCall()
+
+    async def scenario():
+        return await asyncio.gather(*(dispatcher.call("same prompt", upstream) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == ["ok"] * 10
+    assert upstream.calls == 1
+    assert dispatcher.stats()["coalesced"] == 9
+    assert dispatcher.stats()["in_flight_keys"] == 0
+
+
+def test_coalesced_callers_all_see_the_failure():
+    dispatcher = make_dispatcher()
+    upstream = StubCall(error=ConnectionError("reset"))
+
+    async def scenario():
+        return await asyncio.gather(*(dispatcher.call("p", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert upstream.calls == 1
+
+
+def test_semaphore_bounds_concurrent_upstream_calls():
+    dispatcher = make_dispatcher(max_concurrency=2)
+    upstream = StubCall(delay=0.03)
+
+    async def scenario():
+        await asyncio.gather(*(dispatcher.call(f"prompt {i}", upstream) for i in range(6)))
+
+    asyncio.run(scenario())
+    assert upstream.calls == 6
+    assert upstream.peak == 2
+
+
+def test_full_wait_queue_rejects_immediately():
+    dispatcher = make_dispatcher(max_concurrency=1, max_queue=1)
+    upstream = StubCall(delay=0.1)
+
+    async def scenario():
+        return await asyncio.gather(*(dispatcher.call(f"prompt {i}", upstream) for i in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results[:2] == ["ok", "ok"]
+    assert isinstance(results[2], DispatcherOverloaded)
+    assert dispatcher.stats()["rejected"] == 1
+
+
+def test_token_bucket_paces_calls_beyond_the_burst():
+    dispatcher = make_dispatcher(rate=20.0, burst=2)
+    upstream = StubCall(delay=0)
+
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(*(dispatcher.call(f"prompt {i}", upstream) for i in range(6)))
+        return time.monotonic() - started
+
+    # Two calls use the burst; the other four wait 1/20 s each for a token
+    assert asyncio.run(scenario()) >= 0.18
+    assert upstream.calls == 6
+
+
+def test_token_bucket_refuses_waits_past_the_deadline():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=1, clock=clock)
+
+    async def scenario():
+        await bucket.acquire(deadline=10.0)
+        with pytest.raises(DispatchTimeout):
+            await bucket.acquire(deadline=0.5)
+
+    asyncio.run(scenario())
+
+
+def test_slow_upstream_hits_the_request_deadline():
+    dispatcher = make_dispatcher(deadline=0.05)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await dispatcher.call(None, StubCall(delay=1.0))
+
+    asyncio.run(scenario())
+    assert dispatcher.stats()["timeouts"] == 1
+
+
+def test_breaker_opens_then_probes_half_open():
+    clock = FakeClock()
+    dispatcher = make_dispatcher(threshold=2, reset=30.0, clock=clock)
+    failing = StubCall(delay=0, error=ConnectionError("upstream down"))
+    healthy = StubCall(delay=0.05)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await dispatcher.call(None, failing)
+        assert dispatcher.breaker.state == CircuitBreaker.OPEN
+
+        # Open: calls fail fast without reaching the upstream
+        with pytest.raises(CircuitOpenError):
+            await dispatcher.call(None, healthy)
+        assert healthy.calls == 0
+
+        # After the reset period one probe goes through; others still fail fast
+        clock.now = 31.0
+        probe = asyncio.ensure_future(dispatcher.call(None, healthy))
+        await asyncio.sleep(0)
+        assert dispatcher.breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await dispatcher.call(None, healthy)
+        assert await probe == "ok"
+        assert dispatcher.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+    assert healthy.calls == 1
+    assert dispatcher.stats()["short_circuited"] == 2
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = FakeClock()
+    dispatcher = make_dispatcher(threshold=1, reset=10.0, clock=clock)
+    failing = StubCall(delay=0, error=ConnectionError("still down"))
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await dispatcher.call(None, failing)
+        clock.now = 11.0
+        with pytest.raises(ConnectionError):
+            await dispatcher.call(None, failing)
+        assert dispatcher.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await dispatcher.call(None, failing)
+
+    asyncio.run(scenario())
+    assert failing.calls == 2
+
+
+def test_local_errors_do_not_open_the_breaker():
+    dispatcher = make_dispatcher(threshold=2)
+
+    async def scenario():
+        for _ in range(5):
+            with pytest.raises(TypeError):
+                await dispatcher.call(None, StubCall(delay=0, error=TypeError("bad payload")))
+
+    asyncio.run(scenario())
+    assert dispatcher.breaker.state == CircuitBreaker.CLOSED
+    assert dispatcher.stats()["local_errors"] == 5
+
+
+def test_upstream_5xx_through_the_client_opens_the_breaker(stub_upstream, fresh_client, monkeypatch):
+    from app import config
+
+    monkeypatch.setattr(config, "HTTP_RETRIES", 0)
+    dispatcher = make_dispatcher(threshold=2)
+    stub_upstream.script({"status": 500}, {"status": 500}, {"json": gemini_reply("unreached")})
+
+    async def scenario():
+        try:
+            for _ in range(2):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await dispatcher.call(None, lambda: fresh_client.post_json(stub_upstream.url, {}, {}))
+            with pytest.raises(CircuitOpenError):
+                await dispatcher.call(None, lambda: fresh_client.post_json(stub_upstream.url, {}, {}))
+        finally:
+            await fresh_client.close_client()
+
+    asyncio.run(scenario())
+    assert len(stub_upstream.requests) == 2
+    assert dispatcher.stats()["upstream_errors"] == 2
@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import gemini_reply
+
+
+def run(client_module, coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await client_module.close_client()
+    return asyncio.run(scenario())
+
+
+def test_post_json_returns_the_body(stub_upstream, fresh_client):
+    stub_upstream.script({"json": gemini_reply("hello")})
+    body = run(fresh_client, fresh_client.post_json(stub_upstream.url + "/generate", {"q": 1}, {}))
+    assert body == gemini_reply("hello")
+    assert stub_upstream.requests == [("/generate", {"q": 1})]
+
+
+def test_gateway_errors_and_dropped_connections_are_retried(stub_upstream, fresh_client):
+    stub_upstream.script({"status": 503}, {"drop": True}, {"json": gemini_reply("third time")})
+    body = run(fresh_client, fresh_client.post_json(stub_upstream.url, {}, {}, retries=2))
+    assert body == gemini_reply("third time")
+    assert len(stub_upstream.requests) == 3
+
+
+def test_retries_are_bounded(stub_upstream, fresh_client):
+    stub_upstream.script({"status": 503}, {"status": 503}, {"json": gemini_reply("too late")})
+    with pytest.raises(httpx.HTTPStatusError):
+        run(fresh_client, fresh_client.post_json(stub_upstream.url, {}, {}, retries=1))
+    assert len(stub_upstream.requests) == 2
+
+
+def test_client_errors_are_not_retried(stub_upstream, fresh_client):
+    stub_upstream.script({"status": 400})
+    with pytest.raises(httpx.HTTPStatusError):
+        run(fresh_client, fresh_client.post_json(stub_upstream.url, {}, {}, retries=2))
+    assert len(stub_upstream.requests) == 1
+
+
+def test_timeout_applies_per_call_and_is_not_retried(stub_upstream, fresh_client):
+    stub_upstream.script({"delay": 0.5, "json": {}})
+    with pytest.raises(httpx.ReadTimeout):
+        run(fresh_client, fresh_client.post_json(stub_upstream.url, {}, {}, timeout=0.1, retries=2))
+    assert len(stub_upstream.requests) == 1
+
+
+def test_stream_is_retried_only_before_the_first_event(stub_upstream, fresh_client):
+    async def collect():
+        return [event async for event in fresh_client.stream_sse(stub_upstream.url, {}, {}, retries=2)]
+
+    stub_upstream.script({"status": 502}, {"sse": [gemini_reply("a"), gemini_reply("b")]})
+    assert run(fresh_client, collect()) == [gemini_reply("a"), gemini_reply("b")]
+    assert len(stub_upstream.requests) == 2
+
+    received = []
+
+    async def collect_until_broken():
+        async for event in fresh_client.stream_sse(stub_upstream.url, {}, {}, retries=2):
+            received.append(event)
+
+    stub_upstream.script({"sse": [gemini_reply("a"), gemini_reply("b")], "drop_after": 1})
+    with pytest.raises(httpx.RemoteProtocolError):
+        run(fresh_client, collect_until_broken())
+    assert received == [gemini_reply("a")]
+    assert len(stub_upstream.requests) == 3
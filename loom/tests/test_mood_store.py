@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+
+from app.mood_store import MoodStore
+
+
+def test_stop_writes_everything_queued(tmp_path):
+    path = str(tmp_path / "moods.db")
+
+    async def scenario():
+        store = MoodStore(path, batch_size=50, flush_interval=0.05, queue_size=10000)
+        await store.start()
+        for i in range(1000):
+            await store.log(f"user-{i % 7}", "😀", "", "breathe", ts=1000.0 + i)
+        # Let the writer get a batch in flight, then stop mid-drain
+        await asyncio.sleep(0.06)
+        await store.stop()
+        return store
+
+    store = asyncio.run(scenario())
+    assert store.written == 1000
+    assert store.stats()["queued"] == 0
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM mood_logs").fetchone()[0] == 1000
+
+
+def test_history_sees_unflushed_rows(tmp_path):
+    async def scenario():
+        store = MoodStore(str(tmp_path / "moods.db"), batch_size=256, flush_interval=10, queue_size=100)
+        await store.start()
+        await store.log("u1", "😞", "tired", "rest", ts=1.0)
+        await store.log("u1", "😀", "", "journal", ts=2.0)
+        entries = await store.history("u1")
+        await store.stop()
+        return entries
+
+    assert [e["emoji"] for e in asyncio.run(scenario())] == ["😀", "😞"]
+
+
+def test_failed_insert_keeps_the_batch_for_the_retry(tmp_path):
+    path = str(tmp_path / "moods.db")
+
+    async def scenario():
+        store = MoodStore(path, batch_size=10, flush_interval=0.01, queue_size=1000)
+        insert = store._insert
+        failures = []
+
+        def flaky(rows):
+            if len(failures) < 2:
+                failures.append(len(rows))
+                raise sqlite3.OperationalError("database is locked")
+            insert(rows)
+
+        store._insert = flaky
+        await store.start()
+        for i in range(25):
+            await store.log("u1", "😀", "", "breathe", ts=float(i))
+        # The writer hits both failures, pauses, then retries the held batch
+        await asyncio.sleep(0.3)
+        await store.stop()
+        return store, failures
+
+    store, failures = asyncio.run(scenario())
+    assert failures == [10, 10]
+    assert store.errors == 2 and store.written == 25
+    with sqlite3.connect(path) as conn:
+        assert [ts for (ts,) in conn.execute("SELECT ts FROM mood_logs ORDER BY id")] == [float(i) for i in range(25)]
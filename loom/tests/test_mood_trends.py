@@ -0,0 +1,116 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from app.mood_trends import MoodTrendIndex
+
+
+# Midday, so whole-day offsets never cross a date boundary
+NOON = datetime(2026, 6, 15, 12).timestamp()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hydration_expires_only_with_max_age():
+    clock = FakeClock()
+    trends = MoodTrendIndex(["😀", "😞"], clock=clock)
+    assert not trends.is_hydrated("u1")
+
+    trends.hydrate("u1", [("😀", time.time())])
+    clock.now = 10.0
+    assert trends.is_hydrated("u1")
+    assert trends.is_hydrated("u1", max_age=30)
+    assert not trends.is_hydrated("u1", max_age=5)
+
+
+def test_records_apply_between_hydrations():
+    trends = MoodTrendIndex(["😀", "😞"])
+    now = time.time()
+    trends.hydrate("u1", [("😀", now - 60), ("😞", now - 30)])
+    trends.record("u1", "😞", now)
+
+    week = trends.trends("u1", now=now)["windows"]["7"]
+    assert week["distribution"] == {"😀": 1, "😞": 2}
+    assert trends.trends("u1", now=now)["current_mood_streak"] == {"mood": "😞", "count": 2}
+
+
+def test_logs_recorded_during_a_reload_are_kept():
+    trends = MoodTrendIndex(["😀", "😞"])
+    now = time.time()
+
+    async def scenario():
+        async def fetch():
+            # Logged while the store read is in flight: one made it into
+            # the snapshot, the other did not
+            trends.record("u1", "😞", now - 20)
+            trends.record("u1", "😀", now - 10)
+            await asyncio.sleep(0)
+            return [("😀", now - 60), ("😞", now - 20)]
+
+        await trends.reload("u1", fetch)
+
+    asyncio.run(scenario())
+    week = trends.trends("u1", now=now)["windows"]["7"]
+    assert week["distribution"] == {"😀": 2, "😞": 1}
+    assert trends.trends("u1", now=now)["current_mood_streak"] == {"mood": "😀", "count": 1}
+    assert trends._loading == {}
+
+
+def test_failed_reload_stops_collecting():
+    trends = MoodTrendIndex(["😀"])
+
+    async def fetch():
+        raise RuntimeError("store unavailable")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(trends.reload("u1", fetch))
+    assert trends._loading == {}
+    assert not trends.is_hydrated("u1")
+
+
+def test_windows_count_only_their_days():
+    trends = MoodTrendIndex(["😀", "😞"])
+    now = NOON
+    day = 86400
+    for emoji, age in [("😀", 80 * day), ("😞", 20 * day), ("😞", 3 * day), ("😀", 0)]:
+        trends.record("u1", emoji, now - age)
+
+    windows = trends.trends("u1", now=now)["windows"]
+    assert [windows[w]["total_logs"] for w in ("7", "30", "90")] == [2, 3, 4]
+    assert windows["30"]["distribution"] == {"😞": 2, "😀": 1}
+    assert windows["30"]["distribution_pct"] == {"😞": 66.7, "😀": 33.3}
+    assert windows["30"]["dominant_mood"] == "😞"
+    assert trends.trends("u2", now=now)["windows"]["7"]["dominant_mood"] is None
+
+
+def test_streaks_and_transitions():
+    trends = MoodTrendIndex(["😀", "😞"])
+    now = NOON
+    day = 86400
+    # Logged on each of the last four days, after a gap
+    for emoji, age in [("😀", 9 * day), ("😞", 3 * day), ("😞", 2 * day), ("😀", day), ("😀", 0), ("🙂", 0)]:
+        trends.record("u1", emoji, now - age)
+
+    summary = trends.trends("u1", now=now)
+    assert summary["current_logging_streak_days"] == 4
+    assert summary["windows"]["30"]["longest_logging_streak_days"] == 4
+    assert summary["windows"]["30"]["days_logged"] == 5
+    assert summary["current_mood_streak"] == {"mood": "other", "count": 1}
+    transitions = {(t["from"], t["to"]): t["count"] for t in summary["windows"]["30"]["transitions"]}
+    assert transitions == {("😀", "😞"): 1, ("😞", "😞"): 1, ("😞", "😀"): 1, ("😀", "😀"): 1, ("😀", "other"): 1}
+
+
+def test_buckets_older_than_the_horizon_are_dropped():
+    trends = MoodTrendIndex(["😀"], horizon_days=7)
+    now = time.time()
+    trends.record("u1", "😀", now - 30 * 86400)
+    trends.record("u1", "😀", now)
+    assert len(trends._users["u1"].days) == 1
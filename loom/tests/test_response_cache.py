@@ -0,0 +1,133 @@
+import asyncio
+
+from app.response_cache import ResponseCache, SharedCacheTier, response_cache
+from conftest import gemini_reply
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(shared=None, **kwargs):
+    options = dict(ttl=60, max_entries=8, max_bytes=4096, max_prompt_chars=200, shared=shared)
+    options.update(kwargs)
+    return ResponseCache(**options)
+
+
+def get(cache, key):
+    return asyncio.run(cache.get(key))
+
+
+def test_keys_ignore_case_punctuation_and_spacing():
+    cache = make_cache()
+    assert cache.key("I feel  ANXIOUS!", "en") == cache.key("i feel anxious", "EN")
+    assert cache.key("I feel anxious", "en") != cache.key("I feel anxious", "ar")
+    assert cache.key("x" * 201, "en") is None
+    assert cache.key("?!", "en") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert get(cache, "a") == "1"         # a is now the most recent
+    cache.put("c", "3")
+
+    assert get(cache, "b") is None
+    assert get(cache, "a") == "1" and get(cache, "c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = make_cache(ttl=60, clock=clock)
+    cache.put("a", "1")
+    clock.now = 59
+    assert get(cache, "a") == "1"
+    clock.now = 60
+    assert get(cache, "a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_byte_budget_evicts_and_skips_oversized_replies():
+    cache = make_cache(max_entries=100, max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    cache.put("c", "z" * 40)              # 123 bytes with keys: a goes
+    assert get(cache, "a") is None
+    assert cache.stats()["bytes"] <= 100
+
+    cache.put("big", "w" * 200)           # larger than the whole budget
+    assert get(cache, "big") is None
+    assert get(cache, "b") == "y" * 40
+
+    cache.put("b", "short")               # replacing an entry releases its bytes
+    assert cache.stats()["bytes"] == len("b") + len("short") + len("c") + 40
+
+
+def test_uncacheable_keys_are_ignored():
+    cache = make_cache()
+    cache.put(None, "reply")
+    assert get(cache, None) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_crisis_replies_are_never_cached(client, stub_upstream):
+    for _ in range(2):
+        assert client.post("/mental-health/chat", json={"text": "I want to die"}).json()["crisis_detected"]
+    assert response_cache.stats()["entries"] == 0
+    assert stub_upstream.requests == []
+
+    # An ordinary prompt is cached, so a repeat does not reach the upstream
+    stub_upstream.script({"json": gemini_reply("I'm here with you.")})
+    for _ in range(2):
+        client.post("/mental-health/chat", json={"text": "I feel lonely"})
+    assert len(stub_upstream.requests) == 1
+    assert response_cache.stats()["entries"] == 1
+
+
+def test_shared_tier_serves_other_workers(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first = make_cache(SharedCacheTier(path, ttl=60, max_entries=16))
+    second = make_cache(SharedCacheTier(path, ttl=60, max_entries=16))
+    key = first.key("I feel anxious", "en")
+
+    async def scenario():
+        first.put(key, "Let's breathe together.")
+        # Writes are queued on the cache thread; wait for it to drain
+        await asyncio.get_running_loop().run_in_executor(first.shared._executor, lambda: None)
+        return await second.get(key)
+
+    assert asyncio.run(scenario()) == "Let's breathe together."
+    assert second.stats()["shared_hits"] == 1
+
+
+def test_shared_writes_beyond_the_backlog_are_dropped(tmp_path):
+    shared = SharedCacheTier(str(tmp_path / "shared.db"), ttl=60, max_entries=16, max_pending=0)
+    cache = make_cache(shared)
+    key = cache.key("hello", "en")
+
+    cache.put(key, "hi")
+    assert shared.dropped == 1
+    assert asyncio.run(cache.get(key)) == "hi"      # still served from the local tier
+
+
+def test_pending_count_settles_after_queued_writes(tmp_path):
+    shared = SharedCacheTier(str(tmp_path / "shared.db"), ttl=60, max_entries=1000, max_pending=1000)
+    cache = make_cache(shared)
+
+    async def scenario():
+        for i in range(500):
+            cache.put(cache.key(f"prompt {i}", "en"), "reply")
+        # Let the cache thread drain, then the done callbacks run on the loop
+        await asyncio.get_running_loop().run_in_executor(shared._executor, lambda: None)
+        await asyncio.sleep(0.05)
+        return await shared.get(cache.key("prompt 499", "en"))
+
+    assert asyncio.run(scenario())[0] == "reply"
+    assert shared._pending == 0 and shared.dropped == 0
@@ -0,0 +1,60 @@
+import asyncio
+import shutil
+
+from app import config
+from app.response_engine import LocalRetrievalEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def settle(engine):
+    while engine._load_task is not None:
+        await asyncio.sleep(0.01)
+
+
+def test_loads_off_the_loop_and_retries_after_backoff(tmp_path):
+    corpus = tmp_path / "coping_responses.json"
+    clock = FakeClock()
+    engine = LocalRetrievalEngine(str(corpus), str(tmp_path / "index"), backoff=5.0, clock=clock)
+
+    async def scenario():
+        # Missing corpus: the first fallback gets nothing and schedules a load
+        assert engine.respond("I can't sleep", "en") is None
+        await settle(engine)
+        assert engine.error is not None and engine.stats()["failed_loads"] == 1
+
+        # Still backing off: no new attempt even once the corpus exists
+        shutil.copy(config.OFFLINE_CORPUS_PATH, corpus)
+        engine.respond("I can't sleep", "en")
+        assert engine._load_task is None
+
+        clock.now = 5.0
+        assert engine.respond("I can't sleep", "en") is None
+        await settle(engine)
+        return engine.respond("I can't sleep", "en")
+
+    assert asyncio.run(scenario())
+    assert engine.error is None and engine.stats()["loaded"]
+
+
+def test_backoff_doubles_up_to_the_cap(tmp_path):
+    clock = FakeClock()
+    engine = LocalRetrievalEngine(str(tmp_path / "missing.json"), str(tmp_path / "index"),
+                                  backoff=1.0, max_backoff=4.0, clock=clock)
+
+    async def scenario():
+        delays = []
+        for _ in range(4):
+            engine.warm_up()
+            await settle(engine)
+            delays.append(engine._retry_at - clock.now)
+            clock.now = engine._retry_at
+        return delays
+
+    assert asyncio.run(scenario()) == [1.0, 2.0, 4.0, 4.0]
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+from app import config, mental_health
+from conftest import gemini_reply
+
+
+def sse_events(response):
+    """(event, data) pairs of a text/event-stream body, in order"""
+    events = []
+    for block in response.text.split("\n\n"):
+        if block.strip():
+            fields = dict(line.split(": ", 1) for line in block.split("\n"))
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_chunks_are_forwarded_in_order_then_done(client, stub_upstream):
+    stub_upstream.script({"sse": [gemini_reply("You are "), gemini_reply("not "), gemini_reply("alone.")],
+                          "chunk_delay": 0.01})
+    response = client.post("/mental-health/chat?stream=true", json={"text": "I feel lonely tonight"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response)
+    assert events[:3] == [("message", {"text": "You are "}), ("message", {"text": "not "}),
+                          ("message", {"text": "alone."})]
+    assert events[3][0] == "done" and events[3][1]["success"] is True
+    assert len(events) == 4
+    assert [path for path, _ in stub_upstream.requests] == ["/stream"]
+
+
+def test_streamed_reply_is_cached_for_the_next_request(client, stub_upstream):
+    stub_upstream.script({"sse": [gemini_reply("Breathe "), gemini_reply("slowly.")]})
+    client.post("/mental-health/chat?stream=true", json={"text": "I am anxious about tomorrow"})
+    events = sse_events(client.post("/mental-health/chat?stream=true", json={"text": "I am anxious about tomorrow"}))
+
+    assert events[0] == ("message", {"text": "Breathe slowly."})
+    assert len(stub_upstream.requests) == 1
+
+
+@pytest.mark.parametrize("stream", ["true", "false"])
+def test_crisis_short_circuits_before_the_upstream(client, stub_upstream, stream):
+    response = client.post(f"/mental-health/chat?stream={stream}", json={"text": "I want to die"})
+
+    if stream == "true":
+        events = sse_events(response)
+        assert [name for name, _ in events] == ["crisis", "done"]
+        assert events[0][1]["crisis_detected"] is True
+    else:
+        assert response.json()["crisis_detected"] is True
+    assert stub_upstream.requests == []
+
+
+def test_plain_chat_crisis_never_reaches_the_upstream(client, stub_upstream):
+    body = client.post("/chat/", json={"text": "أريد أن أموت"}).json()
+    assert body["crisis_detected"] is True
+    assert stub_upstream.requests == []
+
+
+def test_stream_broken_midway_keeps_sent_text_and_reports_failure(client, stub_upstream):
+    stub_upstream.script({"sse": [gemini_reply("Let's try "), gemini_reply("grounding.")], "drop_after": 1})
+    events = sse_events(client.post("/mental-health/chat?stream=true", json={"text": "everything feels heavy"}))
+
+    assert events == [("message", {"text": "Let's try "}),
+                      ("done", {"success": False, "crisis_detected": False,
+                                "support_resources": mental_health.SUPPORT_RESOURCES})]
+
+
+def test_upstream_failure_before_any_chunk_falls_back(client, stub_upstream, monkeypatch):
+    monkeypatch.setattr(config, "HTTP_RETRIES", 0)
+    stub_upstream.script({"status": 500})
+    events = sse_events(client.post("/mental-health/chat?stream=true", json={"text": "I can't sleep at night"}))
+
+    assert [name for name, _ in events] == ["message", "done"]
+    assert events[0][1]["text"]
+    assert events[1][1]["success"] is False
+
+
+def test_stream_timing_excludes_time_spent_on_a_slow_reader(stub_upstream, fresh_client, monkeypatch):
+    from app.dispatcher import CircuitBreaker, LLMDispatcher
+    from app.metrics import GEMINI_SECONDS
+    from app.response_cache import response_cache
+
+    monkeypatch.setattr(config, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(mental_health, "GEMINI_STREAM_URL", stub_upstream.url + "/stream")
+    monkeypatch.setattr(mental_health, "llm_dispatcher", LLMDispatcher(
+        max_concurrency=4, rate_per_second=100, burst=10, max_queue=10, deadline_seconds=5,
+        breaker=CircuitBreaker(failure_threshold=5, reset_seconds=30),
+    ))
+    stub_upstream.script({"sse": [gemini_reply("One "), gemini_reply("two "), gemini_reply("three.")]})
+    response_cache.clear()
+    before = GEMINI_SECONDS._series.get(("stream",), [None, 0.0, 0])[1:]
+
+    async def slow_reader():
+        async for _ in mental_health.stream_trauma_informed_response("count slowly for me"):
+            await asyncio.sleep(0.2)
+
+    asyncio.run(slow_reader())
+    response_cache.clear()
+    total, count = GEMINI_SECONDS._series[("stream",)][1:]
+    assert count == before[1] + 1
+    assert total - before[0] < 0.2
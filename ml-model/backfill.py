@@ -0,0 +1,409 @@
+"""Re-score historical triage exports offline, optionally replaying them into the regional counts.
+
+    python backfill.py triage.csv --output scored.csv [--workers N] [--chunk-size ROWS]
+    python backfill.py triage.jsonl --output scored.jsonl --replay --reset
+
+Input is CSV, JSONL or Parquet (Parquet needs pyarrow) with the
+/predict-outbreak fields: patient_id, symptoms (a JSON list or a string
+separated by ; , or |), location, severity, duration and optionally
+population_density and a timestamp column. It is read chunk_size rows at
+a time, and chunks are scored in a process pool with the same rules and
+trained model as the service. Results are written in input order as each
+chunk finishes, so memory depends on chunk size and worker count, not on
+the file.
+
+With --replay every valid row is also counted into the shared regional
+store (ML_SHARED_STATE_PATH, as used by multi-worker deployments) on its
+own day, and cluster detection runs over it, so baselines can be rebuilt
+after a rule change. The replay runs in the parent process, in input
+order, so the input should be sorted by time; the workers validate the
+rows and send back only the locations and symptoms it needs. Restart the service
+afterwards so its workers rebuild their baselines. Without --replay the
+rows are still counted in memory when the trained model is used, since
+it takes the week's case count at the location as a feature.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry, base_features, fill_attack_rate
+from outbreak_predictor import OutbreakPredictor, classify_risk, predicts_outbreak
+from regional_store import RegionalCaseStore
+from schemas import PatientData
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.getenv("ML_MODEL_PATH", os.path.join(BASE_DIR, "outbreak_model.pkl"))
+SHARED_STATE_PATH = os.getenv("ML_SHARED_STATE_PATH", os.path.join(BASE_DIR, "data", "shared_state.db"))
+
+REQUIRED_COLUMNS = ("patient_id", "symptoms", "location")
+OUTPUT_COLUMNS = [
+    "patient_id", "location", "timestamp", "risk_probability", "risk_level", "outbreak_predicted",
+    "model_outbreak_probability", "prediction_source", "model_version",
+]
+_SYMPTOM_SEPARATORS = re.compile(r"[;,|]")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def input_format(path):
+    name = path.lower()
+    for suffix in (".gz", ".bz2", ".xz", ".zst"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name.endswith(".parquet"):
+        return "parquet"
+    raise SystemExit(f"Cannot tell the format of {path}; use --format")
+
+
+def read_chunks(path, fmt, chunk_size):
+    """DataFrames of at most chunk_size rows, in file order"""
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={"patient_id": str})
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet input needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def parse_symptoms(value):
+    """Symptom list from a list value or a JSON / separated string; raises ValueError on bad JSON"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(s) for s in value]
+    if not isinstance(value, str):
+        return []
+    value = value.strip()
+    if value.startswith("["):
+        return [str(s) for s in json.loads(value)]
+    return [s for s in (part.strip() for part in _SYMPTOM_SEPARATORS.split(value)) if s]
+
+
+def day_ordinals(chunk, column):
+    """Date ordinal per row from the timestamp column (today when absent or unparseable)"""
+    today = date.today().toordinal()
+    if column not in chunk:
+        return np.full(len(chunk), today, dtype=np.int64)
+    values = chunk[column]
+    if pd.api.types.is_numeric_dtype(values):
+        stamps = pd.to_datetime(values, unit="s", errors="coerce")
+    else:
+        stamps = pd.to_datetime(values, errors="coerce", utc=True).dt.tz_localize(None)
+    days = (stamps.dt.normalize() - pd.Timestamp("1970-01-01")).dt.days + _EPOCH_ORDINAL
+    return days.fillna(today).to_numpy(dtype=np.int64)
+
+
+# Per-process scoring state, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, use_model):
+    _worker["predictor"] = OutbreakPredictor()
+    registry = None
+    if use_model:
+        registry = ModelRegistry(model_path)
+        try:
+            registry.load()
+        except Exception as e:
+            print(f"⚠️ Outbreak model load failed, scoring with rules only: {type(e).__name__}: {e}",
+                  file=sys.stderr)
+            registry = None
+    _worker["registry"] = registry
+
+
+def validate(records):
+    """(PatientData, record index) for each record that passes the request schema, and the rejected count"""
+    patients = []
+    kept = []
+    for i, record in enumerate(records):
+        try:
+            patients.append(PatientData.model_validate(record))
+        except ValueError:
+            continue
+        kept.append(i)
+    return patients, kept, len(records) - len(patients)
+
+
+def score_chunk(records, timestamp_column, with_features):
+    """Validate and rule-score one chunk of row dicts, in a worker.
+
+    Returns (results, replay rows, features, rejected). results holds the
+    rule-based columns for the rows that passed the request schema; replay
+    rows are their (record indexes, locations, symptoms), all the parent
+    needs to replay them in order; features are their model inputs with
+    the attack rate left to fill_attack_rate(), or None without a model.
+    """
+    patients, kept, rejected = validate(records)
+    replay_rows = (kept, [p.location for p in patients], [p.symptoms for p in patients])
+    if not patients:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS), replay_rows, None, rejected
+
+    risk = _worker["predictor"].predict_risk_batch(patients)
+    results = pd.DataFrame({
+        "patient_id": [p.patient_id for p in patients],
+        "location": [p.location for p in patients],
+        "timestamp": [records[i].get(timestamp_column) for i in kept],
+        "risk_probability": np.round(risk, 3),
+        "risk_level": [classify_risk(r) for r in risk],
+    })
+    results["outbreak_predicted"] = [predicts_outbreak(r) for r in risk]
+    results["model_outbreak_probability"] = None
+    results["prediction_source"] = "rules"
+    results["model_version"] = None
+    features = base_features(patients) if with_features and _worker["registry"] is not None else None
+    return results[OUTPUT_COLUMNS], replay_rows, features, rejected
+
+
+def score_model(features):
+    """(outbreak probabilities, model version) for filled-in feature rows, in a worker"""
+    registry = _worker["registry"]
+    return registry.predict_proba(features), registry.version
+
+
+def add_model_scores(results, scored):
+    """Fill the model columns of a score_chunk result from score_model's output"""
+    probability, version = scored
+    results["model_outbreak_probability"] = np.round(probability, 3)
+    results["prediction_source"] = "rules+model"
+    results["model_version"] = version
+    return results
+
+
+class Replay:
+    """Sequential pass over each chunk in input order.
+
+    Counts every row into the regional store on its own day (and runs cluster
+    detection when replaying into the shared store) and returns the cases
+    seen at the row's location over the last 7 days, which the trained
+    model uses as its attack-rate feature, exactly as the service does.
+    """
+
+    def __init__(self, replay_path=None, reset=False):
+        if replay_path is not None:
+            from shared_store import SharedCaseStore, SharedClusterDetector
+
+            self.store = SharedCaseStore(replay_path, window=90)
+            if reset:
+                self.store.reset()
+            self.detector = SharedClusterDetector(self.store)
+        else:
+            self.store = RegionalCaseStore(window=90)
+            self.detector = None
+        self.alerts = 0
+        self.last_day = None
+        self.out_of_order = 0
+
+    def run(self, locations, symptom_lists, days):
+        recent_cases = []
+        transaction = self.store.transaction() if self.detector is not None else nullcontext()
+        with transaction:
+            for location, symptoms, day in zip(locations, symptom_lists, days):
+                day = int(day)
+                if self.last_day is not None and day < self.last_day:
+                    self.out_of_order += 1
+                self.last_day = day if self.last_day is None else max(self.last_day, day)
+                if self.detector is not None:
+                    # The shared detector records the case in the store itself
+                    _, alerts = self.detector.observe(location, symptoms, day)
+                    self.alerts += len(alerts)
+                else:
+                    self.store.record(location, symptoms, day)
+                recent_cases.append(self.store.summary(location, 7, day=day)["total_cases"])
+        return recent_cases
+
+
+class ResultWriter:
+    """Appends result frames to a CSV or JSONL file as they arrive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = input_format(path) == "jsonl"
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._header = True
+        self.rows = 0
+
+    def write(self, frame):
+        if self.jsonl:
+            if len(frame):
+                self._file.write(frame.to_json(orient="records", lines=True, force_ascii=False))
+        else:
+            frame.to_csv(self._file, header=self._header, index=False)
+            self._header = False
+        self.rows += len(frame)
+
+    def close(self):
+        self._file.close()
+
+
+def _parse_or_none(value):
+    try:
+        return parse_symptoms(value)
+    except ValueError:
+        return None
+
+
+def prepare(chunk, args):
+    """(row dicts, day ordinals, rows skipped) for one input chunk.
+
+    Rows missing a required column or with an unparseable symptoms value
+    are skipped here; schema validation happens in score_chunk, in the
+    worker processes.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk]
+    if missing:
+        raise SystemExit(f"Input is missing required column(s): {', '.join(missing)}")
+    valid = chunk[list(REQUIRED_COLUMNS)].notna().all(axis=1).to_numpy()
+    symptom_lists = [_parse_or_none(value) if ok else None for value, ok in zip(chunk["symptoms"], valid)]
+    valid = valid & np.fromiter((symptoms is not None for symptoms in symptom_lists), dtype=bool, count=len(symptom_lists))
+    skipped = int((~valid).sum())
+    if skipped:
+        chunk = chunk[valid]
+        symptom_lists = [symptoms for symptoms in symptom_lists if symptoms is not None]
+
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    records = chunk.to_dict("records")
+    for record, symptoms in zip(records, symptom_lists):
+        record["symptoms"] = symptoms
+        record["patient_id"] = str(record["patient_id"])
+        # Missing optional fields fall back to the schema defaults
+        for field in ("population_density", "site_indicators"):
+            if record.get(field) is None:
+                record.pop(field, None)
+    return records, day_ordinals(chunk, args.timestamp_column), skipped
+
+
+def run(args):
+    fmt = args.format or input_format(args.input)
+    use_model = not args.no_model and os.path.exists(args.model)
+    # Only the model and --replay need the running case counts
+    replay = Replay(args.state_path if args.replay else None, reset=args.reset) if args.replay or use_model else None
+    writer = ResultWriter(args.output)
+
+    workers = args.workers if args.workers is not None else os.cpu_count() or 1
+    if workers > 0:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(args.model, use_model))
+        submit = pool.submit
+        max_pending = 2 * workers
+    else:
+        pool = None
+        _init_worker(args.model, use_model)
+        max_pending = 0
+
+        def submit(func, *func_args):
+            return _Done(func(*func_args))
+
+    # Chunks are validated and rule-scored in the pool; the parent only
+    # replays the valid rows in input order, then sends their features back
+    # to the pool for the model, and writes results in input order
+    validating = deque()
+    modelling = deque()
+    started = time.perf_counter()
+    last_report = started
+    read = skipped = rejected = chunks = 0
+
+    def write_next():
+        results, scored = modelling.popleft()
+        if scored is not None:
+            add_model_scores(results, scored.result())
+        writer.write(results)
+
+    def replay_next():
+        nonlocal rejected
+        scoring, days = validating.popleft()
+        results, (kept, locations, symptom_lists), features, bad = scoring.result()
+        rejected += bad
+        scored = None
+        if replay is not None:
+            recent_cases = replay.run(locations, symptom_lists, days[kept])
+            if features is not None:
+                scored = submit(score_model, fill_attack_rate(features, recent_cases))
+        modelling.append((results, scored))
+        while len(modelling) > max_pending:
+            write_next()
+
+    try:
+        for chunk in read_chunks(args.input, fmt, args.chunk_size):
+            read += len(chunk)
+            records, days, bad = prepare(chunk, args)
+            skipped += bad
+            validating.append((submit(score_chunk, records, args.timestamp_column, use_model), days))
+            chunks += 1
+            while len(validating) > max_pending:
+                replay_next()
+
+            now = time.perf_counter()
+            if now - last_report >= args.progress_seconds:
+                last_report = now
+                print(f"… {read:,} rows read, {writer.rows:,} written, {read / (now - started):,.0f} rows/s",
+                      file=sys.stderr)
+        while validating:
+            replay_next()
+        while modelling:
+            write_next()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "rows_read": read,
+        "rows_scored": writer.rows,
+        "rows_skipped": skipped + rejected,
+        "chunks": chunks,
+        "workers": workers,
+        "model": use_model,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(read / elapsed, 1) if elapsed else None,
+    }
+    if args.replay:
+        summary.update({
+            "replayed_into": args.state_path,
+            "cluster_alerts": replay.alerts,
+            "out_of_order_rows": replay.out_of_order,
+        })
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+class _Done:
+    """Result holder with the Future interface used when scoring in-process"""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="CSV, JSONL or Parquet triage export")
+    parser.add_argument("--output", required=True, help="results file (.csv or .jsonl)")
+    parser.add_argument("--format", choices=("csv", "jsonl", "parquet"), help="input format (default: by extension)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per chunk")
+    parser.add_argument("--workers", type=int, help="scoring processes (default: CPU count; 0 scores in-process)")
+    parser.add_argument("--timestamp-column", default="timestamp", help="column giving each row's date")
+    parser.add_argument("--model", default=MODEL_PATH, help="trained model pickle")
+    parser.add_argument("--no-model", action="store_true", help="score with the rules only")
+    parser.add_argument("--replay", action="store_true", help="count rows into the shared regional store")
+    parser.add_argument("--state-path", default=SHARED_STATE_PATH, help="shared regional store for --replay")
+    parser.add_argument("--reset", action="store_true", help="clear the shared regional store before replaying")
+    parser.add_argument("--progress-seconds", type=float, default=5.0)
+    run(parser.parse_args())
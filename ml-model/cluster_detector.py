@@ -0,0 +1,203 @@
+import math
+from collections import OrderedDict, deque
+from datetime import date, datetime
+
+# Symptom terms (substring match, like the risk rules) grouped by syndrome
+SYNDROME_TERMS = {
+    "respiratory": ["cough", "difficulty_breathing", "shortness_of_breath", "sore_throat", "chest_pain"],
+    "gastrointestinal": ["diarrhea", "vomiting", "nausea", "abdominal_pain"],
+    "febrile_rash": ["rash"],
+    "febrile": ["fever"],
+}
+OTHER_SYNDROME = "other"
+
+
+class _Series:
+    """Counts for one (location, syndrome) pair.
+
+    ``recent`` is a ring of the last ``window`` daily counts (slot day % window,
+    owner day in ``recent_days``); mean/var are an EWMA baseline over closed
+    days and cusum is a one-sided CUSUM of daily excess over that baseline.
+    """
+
+    __slots__ = ("day", "count", "mean", "var", "cusum", "days_seen", "alerted_day",
+                 "recent", "recent_days")
+
+    def __init__(self, day, window):
+        self.day = day
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum = 0.0
+        self.days_seen = 0
+        self.alerted_day = None
+        self.recent = [0] * window
+        self.recent_days = [None] * window
+
+
+class ClusterDetector:
+    """Streaming spike detection on per-location, per-syndrome daily counts.
+
+    Each event increments today's count for every syndrome the patient shows
+    and compares it with an EWMA baseline of previous days (z-score) and a
+    CUSUM of recent excess. Closing a day is a constant-size update (gaps
+    longer than ``max_gap_days`` are folded in as one reset), so work per
+    event is O(1) amortized. An alert fires at most once per series per day.
+    """
+
+    def __init__(self, alpha=0.1, z_threshold=3.0, cusum_k=0.5, cusum_h=4.0,
+                 min_cases=5, warmup_days=3, burst_cases=15, window=7,
+                 max_gap_days=30, max_series=20000, max_alerts=500):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.min_cases = min_cases
+        self.warmup_days = warmup_days
+        self.burst_cases = burst_cases
+        self.window = window
+        self.max_gap_days = max_gap_days
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._syndromes = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self.events = 0
+
+    def syndromes(self, symptoms):
+        """Syndromes for a symptom list; memoized per distinct symptom string"""
+        found = set()
+        for symptom in symptoms:
+            token = symptom.lower()
+            names = self._syndromes.get(token)
+            if names is None:
+                names = frozenset(
+                    name for name, terms in SYNDROME_TERMS.items() if any(t in token for t in terms)
+                )
+                if len(self._syndromes) < 50000:
+                    self._syndromes[token] = names
+            found |= names
+        return found or {OTHER_SYNDROME}
+
+    def _close_day(self, series, day):
+        """Fold finished days into the baseline before counting on ``day``"""
+        gap = day - series.day
+        if gap <= 0:
+            return
+        if gap > self.max_gap_days:
+            # Long silence: restart the baseline rather than replaying every empty day
+            series.mean = series.var = series.cusum = 0.0
+            series.days_seen = 0
+        else:
+            counts = [series.count] + [0] * (gap - 1)
+            for count in counts:
+                self._update_baseline(series, count)
+        series.day = day
+        series.count = 0
+
+    @staticmethod
+    def _sd(series):
+        """Baseline spread, at least the Poisson sd of the mean count.
+
+        A few days of small counts can have an EWMA variance far below the
+        count noise (5, 6, 5, 6 gives 0.5), which would make ordinary days
+        look like spikes.
+        """
+        return math.sqrt(max(series.var, series.mean, 1.0))
+
+    def _update_baseline(self, series, count):
+        sd = self._sd(series)
+        if series.days_seen >= self.warmup_days:
+            series.cusum = max(0.0, series.cusum + (count - series.mean) / sd - self.cusum_k)
+        if series.days_seen == 0:
+            series.mean = float(count)
+        else:
+            delta = count - series.mean
+            series.mean += self.alpha * delta
+            series.var = (1 - self.alpha) * (series.var + self.alpha * delta * delta)
+        series.days_seen += 1
+
+    def _get(self, key, day):
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                self._series.popitem(last=False)
+            series = _Series(day, self.window)
+            self._series[key] = series
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    @staticmethod
+    def _today():
+        return date.today().toordinal()
+
+    def observe(self, location, symptoms, day=None):
+        """Count one patient; returns (similar cases over the window, alerts raised)"""
+        day = self._today() if day is None else day
+        location = location.strip().lower()
+        self.events += 1
+
+        similar = 0
+        raised = []
+        for syndrome in self.syndromes(symptoms):
+            series = self._get((location, syndrome), day)
+            self._close_day(series, day)
+            series.count += 1
+
+            slot = day % self.window
+            if series.recent_days[slot] != day:
+                series.recent_days[slot] = day
+                series.recent[slot] = 0
+            series.recent[slot] += 1
+            similar = max(similar, sum(
+                n for n, d in zip(series.recent, series.recent_days)
+                if d is not None and day - d < self.window
+            ))
+
+            alert = self._check(location, syndrome, series, day)
+            if alert is not None:
+                raised.append(alert)
+        return similar, raised
+
+    def _check(self, location, syndrome, series, day):
+        if series.alerted_day == day or series.count < self.min_cases:
+            return None
+
+        sd = self._sd(series)
+        zscore = (series.count - series.mean) / sd
+        # CUSUM including today's partial count
+        cusum = max(0.0, series.cusum + zscore - self.cusum_k)
+
+        if series.days_seen < self.warmup_days:
+            triggered = series.count >= self.burst_cases
+            method = "burst"
+        elif zscore >= self.z_threshold:
+            triggered, method = True, "ewma_zscore"
+        elif cusum >= self.cusum_h:
+            triggered, method = True, "cusum"
+        else:
+            triggered = False
+
+        if not triggered:
+            return None
+
+        series.alerted_day = day
+        alert = {
+            "location": location,
+            "syndrome": syndrome,
+            "cases_today": series.count,
+            "baseline_mean": round(series.mean, 2),
+            "baseline_sd": round(sd, 2),
+            "zscore": round(zscore, 2),
+            "cusum": round(cusum, 2),
+            "method": method,
+            "day": date.fromordinal(day).isoformat(),
+            "detected_at": datetime.now().isoformat(),
+        }
+        self.alerts.append(alert)
+        return alert
+
+    def recent_alerts(self, location=None, limit=50):
+        alerts = [a for a in reversed(self.alerts)
+                  if location is None or a["location"] == location.strip().lower()]
+        return alerts[:limit]
@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import time
+
+import numpy as np
+import pandas as pd
+
+from schemas import Duration, Severity
+
+# Bit i of an event's symptom bitset is set when a reported symptom contains
+# SYMPTOM_VOCABULARY[i] (same substring semantics as the risk rules); the
+# last bit marks symptoms matching none of them. Append new terms only, so
+# bits in segments already on disk keep their meaning.
+SYMPTOM_VOCABULARY = [
+    "fever", "cough", "difficulty_breathing", "diarrhea", "vomiting", "headache", "rash",
+    "chest_pain", "severe_pain", "shortness_of_breath", "sore_throat", "nausea", "abdominal_pain",
+    "fatigue", "body_aches", "chills", "sweating", "dizziness", "loss_of_appetite", "runny_nose",
+    "dehydration", "jaundice", "bleeding", "seizure", "stiff_neck", "joint_pain", "confusion",
+]
+OTHER_SYMPTOM_BIT = 1 << 63
+
+SEVERITY_CODES = {member: code for code, member in enumerate(Severity)}
+DURATION_CODES = {member: code for code, member in enumerate(Duration)}
+
+COLUMNS = {
+    "ts": np.float64,
+    "patient": np.uint64,
+    "location": np.int32,
+    "symptoms": np.uint64,
+    "severity": np.int8,
+    "duration": np.int8,
+}
+
+
+class EventLog:
+    """Append-only, columnar log of scored patients.
+
+    push() is a put_nowait of one small tuple, so the request path has a
+    constant cost; when the queue is full the event is dropped and counted
+    rather than slowing the handler. A background task turns queued events
+    into column buffers (hashed patient id, dictionary-coded location,
+    symptom bitset, severity and duration codes) and writes a segment
+    directory of .npy files per segment_rows events or flush_seconds,
+    whichever comes first. Segments are renamed into place once complete,
+    so readers only ever see whole segments; see read_events(). Buffered
+    events are kept until their segment is on disk, so a failed write is
+    retried rather than lost.
+
+    Patient ids are stored as keyed BLAKE2b hashes. Without a hash_key, a
+    random key is generated once and kept in the log directory (.hash_key),
+    so hashes stay stable across restarts and workers but cannot be
+    recomputed from a guessed id without that file.
+    """
+
+    KEY_FILE = ".hash_key"
+
+    def __init__(self, directory, queue_size=10000, segment_rows=65536, flush_seconds=60.0, hash_key=None):
+        if hash_key is not None and not hash_key:
+            raise ValueError("hash_key must not be empty; pass None to generate one")
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.flush_seconds = flush_seconds
+        self.hash_key = hash_key
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._has_events = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task = None
+        self._write_lock = asyncio.Lock()
+        self._bits = {term: 1 << i for i, term in enumerate(SYMPTOM_VOCABULARY)}
+        self._masks = {}
+        self._reset()
+        self._sequence = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.segments = 0
+        self.errors = 0
+
+    def _reset(self):
+        self._columns = {name: [] for name in COLUMNS}
+        self._locations = {}
+        self._opened_at = None
+
+    def _load_key(self):
+        """The log directory's hash key, created on first use"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self.KEY_FILE)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_bytes(32))
+        # Another worker may have just created it; read back whichever key won
+        for _ in range(50):
+            with open(path, "rb") as f:
+                key = f.read()
+            if key:
+                return key
+            time.sleep(0.01)
+        raise OSError(f"{path} is empty")
+
+    async def start(self):
+        if self.hash_key is None:
+            self.hash_key = await asyncio.to_thread(self._load_key)
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let the writer finish a segment in flight rather than cancel it
+            # mid-write, which would leave its rows buffered and written twice
+            self._stopping.set()
+            self._has_events.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except OSError as e:
+            print(f"⚠️ Event log flush on shutdown failed, {len(self._columns['ts'])} events lost: {e}")
+
+    def push(self, patient_id, location, symptoms, severity, duration, ts=None):
+        """Queue one event; returns False (and counts a drop) if the queue is full"""
+        try:
+            self._queue.put_nowait(
+                (time.time() if ts is None else ts, patient_id, location, symptoms, severity, duration)
+            )
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        self._has_events.set()
+        return True
+
+    def symptom_mask(self, symptoms):
+        mask = 0
+        for symptom in symptoms:
+            token_mask = self._masks.get(symptom)
+            if token_mask is None:
+                lowered = symptom.lower()
+                token_mask = 0
+                for term, bit in self._bits.items():
+                    if term in lowered:
+                        token_mask |= bit
+                token_mask = token_mask or OTHER_SYMPTOM_BIT
+                if len(self._masks) < 50000:
+                    self._masks[symptom] = token_mask
+            mask |= token_mask
+        return mask
+
+    def patient_hash(self, patient_id):
+        if self.hash_key is None:
+            self.hash_key = self._load_key()
+        digest = hashlib.blake2b(patient_id.encode(), digest_size=8, key=self.hash_key).digest()
+        return int.from_bytes(digest, "little")
+
+    def _append(self, event):
+        ts, patient_id, location, symptoms, severity, duration = event
+        # Everything that can fail runs before the first column grows, so
+        # a bad event never leaves the columns different lengths
+        patient = self.patient_hash(patient_id)
+        mask = self.symptom_mask(symptoms)
+        location = location.strip().lower()
+        code = self._locations.get(location)
+        if code is None:
+            code = self._locations[location] = len(self._locations)
+        columns = self._columns
+        columns["ts"].append(ts)
+        columns["patient"].append(patient)
+        columns["location"].append(code)
+        columns["symptoms"].append(mask)
+        columns["severity"].append(SEVERITY_CODES.get(severity, SEVERITY_CODES[Severity.UNKNOWN]))
+        columns["duration"].append(DURATION_CODES.get(duration, DURATION_CODES[Duration.UNKNOWN]))
+        if self._opened_at is None:
+            self._opened_at = time.monotonic()
+
+    def _drain(self):
+        while len(self._columns["ts"]) < self.segment_rows:
+            try:
+                event = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            try:
+                self._append(event)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Event log skipped a malformed event: {type(e).__name__}: {e}")
+
+    def _write_segment(self, arrays, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"seg-{int(meta['min_ts'] * 1000):013d}-{os.getpid()}-{self._sequence:06d}"
+        self._sequence += 1
+        staging = os.path.join(self.directory, f".{name}.tmp")
+        os.makedirs(staging, exist_ok=True)
+        for column, values in arrays.items():
+            np.save(os.path.join(staging, f"{column}.npy"), values)
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.rename(staging, os.path.join(self.directory, name))
+
+    async def _write(self):
+        """Write the buffered events as one segment; they stay buffered if it fails"""
+        rows = len(self._columns["ts"])
+        if not rows:
+            return
+        arrays = {name: np.array(values, dtype=COLUMNS[name]) for name, values in self._columns.items()}
+        meta = {
+            "rows": rows,
+            "min_ts": float(arrays["ts"].min()),
+            "max_ts": float(arrays["ts"].max()),
+            "locations": list(self._locations),
+            "symptom_vocabulary": SYMPTOM_VOCABULARY,
+            "severity": [member.value for member in Severity],
+            "duration": [member.value for member in Duration],
+        }
+        try:
+            await asyncio.to_thread(self._write_segment, arrays, meta)
+        except OSError:
+            self.errors += 1
+            raise
+        self._reset()
+        self.written += rows
+        self.segments += 1
+
+    async def _writer(self):
+        while not self._stopping.is_set():
+            if self._opened_at is None:
+                await self._has_events.wait()
+            else:
+                # A partial segment is written once it is flush_seconds old
+                remaining = self._opened_at + self.flush_seconds - time.monotonic()
+                try:
+                    await asyncio.wait_for(self._has_events.wait(), max(remaining, 0.0))
+                except asyncio.TimeoutError:
+                    pass
+            self._has_events.clear()
+            try:
+                async with self._write_lock:
+                    self._drain()
+                    full = len(self._columns["ts"]) >= self.segment_rows
+                    if full:
+                        # More may be queued than one segment holds
+                        self._has_events.set()
+                    if full or (self._opened_at is not None and time.monotonic() - self._opened_at >= self.flush_seconds):
+                        await self._write()
+            except Exception as e:
+                # Keep the writer alive; buffered events are retried on the next pass
+                print(f"⚠️ Event log write failed, retrying: {type(e).__name__}: {e}")
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def flush(self):
+        """Write everything queued so far as segments"""
+        async with self._write_lock:
+            while True:
+                self._drain()
+                await self._write()
+                if self._queue.empty():
+                    return
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "buffered": len(self._columns["ts"]),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "segments": self.segments,
+            "errors": self.errors,
+        }
+
+
+def list_segments(directory, since=None, until=None):
+    """(path, meta) of complete segments overlapping [since, until], oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith("seg-"):
+            continue
+        path = os.path.join(directory, name)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if since is not None and meta["max_ts"] < since:
+            continue
+        if until is not None and meta["min_ts"] >= until:
+            continue
+        found.append((path, meta))
+    return found
+
+
+def read_events(directory, since=None, until=None, columns=tuple(COLUMNS)):
+    """Events in [since, until) as one DataFrame.
+
+    Columns are memory-mapped from each segment, and location becomes a
+    Categorical over the union of the segments' location dictionaries, so
+    vectorized filters and group-bys never materialize per-row strings.
+    Test symptoms with ``frame.symptoms & symptom_bit(name)``.
+    """
+    segments = list_segments(directory, since, until)
+    columns = list(columns)
+    if not segments:
+        return pd.DataFrame({name: np.zeros(0, dtype=COLUMNS[name]) for name in columns})
+
+    categories = []
+    category_codes = {}
+    frames = []
+    for path, meta in segments:
+        data = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in set(columns) | {"ts"}}
+        keep = np.ones(meta["rows"], dtype=bool)
+        if since is not None:
+            keep &= data["ts"] >= since
+        if until is not None:
+            keep &= data["ts"] < until
+        frame = {}
+        for name in columns:
+            values = data[name] if keep.all() else data[name][keep]
+            if name == "location":
+                remap = np.empty(len(meta["locations"]), dtype=np.int32)
+                for code, location in enumerate(meta["locations"]):
+                    if location not in category_codes:
+                        category_codes[location] = len(categories)
+                        categories.append(location)
+                    remap[code] = category_codes[location]
+                values = remap[values]
+            frame[name] = values
+        frames.append(pd.DataFrame(frame, copy=False))
+
+    events = pd.concat(frames, ignore_index=True)
+    if "location" in events:
+        events["location"] = pd.Categorical.from_codes(events["location"], categories)
+    return events
+
+
+def symptom_bit(name):
+    """Bit for a vocabulary symptom in the events' symptoms column"""
+    return np.uint64(1 << SYMPTOM_VOCABULARY.index(name))
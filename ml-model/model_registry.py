@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from schemas import Duration
+
+# Settlement-level indicators the trained forest expects, with camp baseline
+# values used when a request does not supply them
+FEATURE_DEFAULTS = {
+    "population_size": 25000.0,
+    "population_density_per_sqkm": 2000.0,
+    "attack_rate_percent": 0.0,
+    "case_fatality_rate_percent": 1.0,
+    "duration_days": 7.0,
+    "sanitation_score": 5.5,
+    "vaccination_coverage_percent": 55.0,
+    "malnutrition_prevalence_percent": 15.0,
+    "overcrowding_index": 2.5,
+    "temperature_avg": 25.0,
+    "rainfall_mm": 200.0,
+    "healthcare_facilities": 4.0,
+    "medical_staff_ratio": 2.5,
+    "isolation_capacity": 50.0,
+    "response_time_hours": 24.0,
+}
+
+DURATION_DAYS = {
+    Duration.MORE_THAN_WEEK: 10.0,
+    Duration.THREE_TO_SEVEN_DAYS: 5.0,
+    Duration.ONE_TO_THREE_DAYS: 2.0,
+}
+
+
+def base_features(patients):
+    """One feature row per patient, with the attack rate still to be filled.
+
+    Request fields fill population density and duration, and any
+    ``site_indicators`` on the patient override the baseline defaults. The
+    attack rate is NaN unless the request gave one; see fill_attack_rate().
+    """
+    rows = []
+    for patient in patients:
+        row = dict(FEATURE_DEFAULTS)
+        row["population_density_per_sqkm"] = float(patient.population_density)
+        row["duration_days"] = DURATION_DAYS.get(patient.duration, FEATURE_DEFAULTS["duration_days"])
+        row["attack_rate_percent"] = np.nan
+        row.update({k: float(v) for k, v in patient.site_indicators.items() if k in FEATURE_DEFAULTS})
+        rows.append(row)
+    return pd.DataFrame(rows, columns=list(FEATURE_DEFAULTS))
+
+
+def fill_attack_rate(features, recent_cases):
+    """Derive missing attack rates from recent_cases (cases seen at each
+    patient's location this week); returns features, filled in place"""
+    missing = features["attack_rate_percent"].isna().to_numpy()
+    if missing.any():
+        cases = np.asarray(recent_cases, dtype=float)[missing]
+        population = np.maximum(features["population_size"].to_numpy()[missing], 1.0)
+        features.loc[missing, "attack_rate_percent"] = 100.0 * cases / population
+    return features
+
+
+def build_features(patients, recent_cases):
+    """One feature row per patient; recent_cases gives the attack rate"""
+    return fill_attack_rate(base_features(patients), recent_cases)
+
+
+class ModelRegistry:
+    """Lazily loaded, hot-swappable scikit-learn outbreak model.
+
+    Nothing is read at import time: the first ensure_loaded() call (or the
+    startup warm-up) loads the pickle on a worker thread. Afterwards the file
+    is stat'ed at most every reload_seconds and a changed file is loaded in
+    the background; the new model replaces the old one in a single reference
+    swap, so requests already scoring keep the model they started with. If
+    loading fails, predict_proba returns None and callers use the rules.
+    """
+
+    def __init__(self, path, mmap=False, reload_seconds=30.0, clock=time.monotonic):
+        self.path = path
+        self.mmap = mmap
+        self.reload_seconds = reload_seconds
+        self._clock = clock
+        self._model = None
+        self._lock = asyncio.Lock()
+        self._reload_task = None
+        self._checked_at = None
+        self.state = "not_loaded"
+        self.version = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.error = None
+        self._mtime = None
+
+    def _load(self):
+        import joblib
+
+        started = time.perf_counter()
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        model = joblib.load(self.path, mmap_mode="r" if self.mmap else None)
+        if not hasattr(model, "predict_proba"):
+            raise TypeError(f"{type(model).__name__} has no predict_proba")
+        return model, mtime, digest, time.perf_counter() - started
+
+    async def _load_and_swap(self):
+        async with self._lock:
+            try:
+                if self._model is None:
+                    self.state = "loading"
+                model, mtime, digest, seconds = await asyncio.to_thread(self._load)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                self._mtime = self._current_mtime()
+                if self._model is None:
+                    self.state = "failed"
+                print(f"⚠️ Outbreak model load failed, using rule-based predictor: {self.error}")
+                return
+            self._install(model, mtime, digest, seconds)
+            print(f"✅ Outbreak model {self.version} loaded in {self.load_seconds}s")
+
+    def _install(self, model, mtime, digest, seconds):
+        self._model = model
+        self._mtime = mtime
+        self.version = f"{datetime.fromtimestamp(mtime):%Y%m%d%H%M%S}-{digest}"
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = round(seconds, 3)
+        self.error = None
+        self.state = "loaded"
+
+    def load(self):
+        """Load synchronously, for scripts and worker processes; raises on failure"""
+        self._checked_at = self._clock()
+        self._install(*self._load())
+
+    def _current_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    async def ensure_loaded(self):
+        """Load on first use; afterwards schedule a background reload if the file changed"""
+        if self._checked_at is None:
+            self._checked_at = self._clock()
+            await self._load_and_swap()
+            return
+        if self._clock() - self._checked_at < self.reload_seconds:
+            return
+        self._checked_at = self._clock()
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        if self._current_mtime() not in (None, self._mtime):
+            self._reload_task = asyncio.create_task(self._load_and_swap())
+
+    def warm_up(self):
+        """Start loading in the background without blocking startup"""
+        if self._checked_at is None:
+            self._checked_at = self._clock()
+            self._reload_task = asyncio.create_task(self._load_and_swap())
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def predict_proba(self, features: pd.DataFrame):
+        """Outbreak probability per row, or None when no model is loaded"""
+        model = self._model
+        if model is None or features.empty:
+            return None if model is None else np.zeros(0)
+        probabilities = model.predict_proba(features)
+        positive = list(model.classes_).index(1) if 1 in model.classes_ else probabilities.shape[1] - 1
+        return probabilities[:, positive]
+
+    def info(self):
+        model = self._model
+        return {
+            "model_loaded": model is not None,
+            "state": self.state,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "estimator": type(model).__name__ if model is not None else None,
+            "n_features": int(getattr(model, "n_features_in_", 0)) if model is not None else None,
+            "memory_mapped": self.mmap,
+            "path": os.path.basename(self.path),
+            "error": self.error,
+        }
+
+
+class ModelBatcher:
+    """Scores concurrent requests together, off the event loop.
+
+    A forest's predict_proba costs several milliseconds per call however
+    few rows it gets, so requests do not call it directly. They queue their
+    patients here; one task collects whatever arrived within max_wait (or
+    while the previous batch was scoring), builds a single feature frame
+    and scores it on a worker thread, then hands each request its rows.
+    If a combined batch fails, its requests are re-scored one by one so an
+    error only reaches the request that caused it.
+    """
+
+    def __init__(self, registry, max_batch=256, max_wait=0.002):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = []
+        self._pending_rows = 0
+        self._task = None
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+
+    async def predict(self, patients, recent_cases):
+        """Outbreak probability per patient, or None when no model is loaded"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((patients, recent_cases, future))
+        self._pending_rows += len(patients)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    def _score(self, patients, recent_cases):
+        return self.registry.predict_proba(build_features(patients, recent_cases))
+
+    async def _run(self):
+        try:
+            while self._pending:
+                if self._pending_rows < self.max_batch:
+                    await asyncio.sleep(self.max_wait)
+                batch, self._pending, self._pending_rows = self._pending, [], 0
+                patients = [p for entry in batch for p in entry[0]]
+                recent_cases = [c for entry in batch for c in entry[1]]
+                try:
+                    probabilities = await asyncio.to_thread(self._score, patients, recent_cases)
+                except Exception as e:
+                    if len(batch) == 1:
+                        self._fail(batch[0][2], e)
+                    else:
+                        # Score each request on its own so only the bad one fails
+                        await self._score_separately(batch)
+                    continue
+                self.batches += 1
+                self.rows += len(patients)
+                start = 0
+                for entry_patients, _, future in batch:
+                    stop = start + len(entry_patients)
+                    if not future.done():
+                        future.set_result(None if probabilities is None else probabilities[start:stop])
+                    start = stop
+        finally:
+            self._task = None
+
+    def _fail(self, future, error):
+        self.errors += 1
+        if not future.done():
+            future.set_exception(error)
+
+    async def _score_separately(self, batch):
+        for entry_patients, entry_cases, future in batch:
+            try:
+                probabilities = await asyncio.to_thread(self._score, entry_patients, entry_cases)
+            except Exception as e:
+                self._fail(future, e)
+                continue
+            self.batches += 1
+            self.rows += len(entry_patients)
+            if not future.done():
+                future.set_result(probabilities)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch": round(self.rows / self.batches, 1) if self.batches else None,
+            "queued": self._pending_rows,
+            "errors": self.errors,
+        }
@@ -0,0 +1,175 @@
+import numpy as np
+
+from schemas import Severity, Duration
+
+HIGH_RISK_SYMPTOMS = ['fever', 'difficulty_breathing', 'chest_pain', 'severe_pain']
+
+SEVERITY_WEIGHTS = {
+    Severity.HIGH: 0.3, 
+    Severity.MEDIUM: 0.15, 
+    Severity.LOW: 0.05
+}
+
+DURATION_WEIGHTS = {
+    Duration.MORE_THAN_WEEK: 0.2,
+    Duration.THREE_TO_SEVEN_DAYS: 0.1,
+    Duration.ONE_TO_THREE_DAYS: 0.05
+}
+
+def classify_risk(risk_probability):
+    """High / Medium / Low for a rule-based risk probability"""
+    if risk_probability > 0.75:
+        return "High"
+    if risk_probability > 0.5:
+        return "Medium"
+    return "Low"
+
+def predicts_outbreak(risk_probability):
+    """Outbreak call from the rule-based risk probability.
+
+    The trained model only sees two patient-level features (the rest are
+    settlement baselines), so its probability is reported alongside this
+    call rather than replacing it.
+    """
+    return risk_probability > 0.7
+
+class SymptomIndex:
+    """Symptom vocabulary compiled once into bit positions.
+
+    Every term used by a combination rule or the individual risk list gets a
+    bit. A reported symptom string resolves to the bitmask of the terms it
+    contains (same substring semantics as before) plus its count of
+    individual risk terms; both are memoized per distinct string, so a
+    patient's feature bitset is built in one pass over their symptoms and
+    each combination rule is a single AND/compare.
+    """
+
+    MAX_CACHED_TOKENS = 50000
+
+    def __init__(self, combinations, risk_symptoms):
+        vocabulary = []
+        for term in [s for combo in combinations for s in combo] + list(risk_symptoms):
+            if term not in vocabulary:
+                vocabulary.append(term)
+        self.bits = {term: 1 << i for i, term in enumerate(vocabulary)}
+        self.combo_masks = [self.mask_of(combo) for combo in combinations]
+        self.combo_terms_mask = 0
+        for mask in self.combo_masks:
+            self.combo_terms_mask |= mask
+        self.risk_bits = [self.bits[term] for term in risk_symptoms]
+        self._tokens = {}
+        self._combo_hits = {}
+
+    def mask_of(self, terms):
+        mask = 0
+        for term in terms:
+            mask |= self.bits[term]
+        return mask
+
+    def resolve_token(self, token):
+        """(bitmask, individual risk hits) for one symptom string.
+
+        Memoized on the string as given; PatientData already lowercases
+        symptoms, so lowercasing only happens on a memo miss.
+        """
+        features = self._tokens.get(token)
+        if features is None:
+            lowered = token.lower()
+            mask = 0
+            for term, bit in self.bits.items():
+                if term in lowered:
+                    mask |= bit
+            hits = sum(1 for bit in self.risk_bits if mask & bit)
+            features = (mask, hits)
+            if len(self._tokens) >= self.MAX_CACHED_TOKENS:
+                self._tokens.clear()
+            self._tokens[token] = features
+        return features
+
+    def resolve(self, symptoms):
+        """(feature bitset, individual risk hits) for a patient's symptoms"""
+        mask = 0
+        hits = 0
+        for symptom in symptoms:
+            token_mask, token_hits = self.resolve_token(symptom)
+            mask |= token_mask
+            hits += token_hits
+        return mask, hits
+
+    def combo_hit(self, mask):
+        """True if any high-risk combination is fully present in mask"""
+        hit = self._combo_hits.get(mask)
+        if hit is None:
+            hit = any(mask & combo == combo for combo in self.combo_masks)
+            self._combo_hits[mask] = hit
+        return hit
+
+# Simple ML logic without .pkl file
+class OutbreakPredictor:
+    def __init__(self):
+        self.high_risk_combinations = [
+            ["fever", "cough", "difficulty_breathing"],
+            ["fever", "diarrhea", "vomiting"],
+            ["fever", "headache", "rash"]
+        ]
+        self.symptom_index = SymptomIndex(self.high_risk_combinations, HIGH_RISK_SYMPTOMS)
+        print("✅ ML Outbreak Predictor initialized ")
+    
+    def has_combo_symptom(self, symptoms):
+        """True if any symptom belongs to a high-risk combination"""
+        mask, _ = self.symptom_index.resolve(symptoms)
+        return bool(mask & self.symptom_index.combo_terms_mask)
+    
+    def predict_risk(self, symptoms, severity, location, duration):
+        """Enhanced risk prediction logic"""
+        base_risk = 0.3
+        
+        # High risk symptom combinations
+        symptom_risk = 0
+        mask, risk_hits = self.symptom_index.resolve(symptoms)
+        
+        if self.symptom_index.combo_hit(mask):
+            symptom_risk += 0.4
+        
+        # Individual high-risk symptoms
+        for _ in range(risk_hits):
+            symptom_risk += 0.15
+        
+        # Severity multiplier (severity and duration arrive normalized)
+        severity_multiplier = SEVERITY_WEIGHTS.get(severity, 0.1)
+        
+        # Duration factor
+        duration_factor = DURATION_WEIGHTS.get(duration, 0.05)
+        
+        # Location risk (camps have higher density)
+        location_risk = 0.2 if 'camp' in location.lower() else 0.1
+        
+        total_risk = min(base_risk + symptom_risk + severity_multiplier + duration_factor + location_risk, 1.0)
+        
+        return total_risk
+
+    def predict_risk_batch(self, patients):
+        """Vectorized predict_risk over a list of PatientData records"""
+        if not patients:
+            return np.zeros(0)
+        n = len(patients)
+
+        # Symptom features come from the precompiled index
+        index = self.symptom_index
+        features = [index.resolve(p.symptoms) for p in patients]
+        combo_hit = np.fromiter((index.combo_hit(mask) for mask, _ in features), dtype=bool, count=n)
+        hits = np.fromiter((risk_hits for _, risk_hits in features), dtype=np.int64, count=n)
+
+        symptom_risk = np.where(combo_hit, 0.4, 0.0)
+        # Add 0.15 once per hit so the float sums match predict_risk bit for bit
+        for i in range(int(hits.max(initial=0))):
+            symptom_risk = np.where(hits > i, symptom_risk + 0.15, symptom_risk)
+
+        # Per-row lookups are plain dict gets; building a DataFrame for three
+        # columns cost more than the arithmetic it vectorized
+        severity_multiplier = np.fromiter((SEVERITY_WEIGHTS.get(p.severity, 0.1) for p in patients), dtype=float, count=n)
+        duration_factor = np.fromiter((DURATION_WEIGHTS.get(p.duration, 0.05) for p in patients), dtype=float, count=n)
+        location_risk = np.fromiter((0.2 if 'camp' in p.location.lower() else 0.1 for p in patients), dtype=float, count=n)
+
+        total_risk = 0.3 + symptom_risk + severity_multiplier + duration_factor + location_risk
+        return np.minimum(total_risk, 1.0)
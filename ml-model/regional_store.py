@@ -0,0 +1,177 @@
+import heapq
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+
+
+OTHER_SYMPTOMS = "other"
+
+
+class _LocationBuffer:
+    """Per-location ring of daily buckets.
+
+    Slot ``day % window`` holds the counts for ``day``; ``days[slot]`` records
+    which day currently owns the slot, so a slot left over from an older day
+    is reset on the next write and ignored on read. Symptom counts are an
+    int32 matrix of window x (symptoms seen at this location); ``names``
+    maps its columns back to symptom names. Columns grow by doubling, and
+    columns whose symptoms have rolled out of the window are reclaimed.
+    """
+
+    __slots__ = ("days", "cases", "symptoms", "names", "ids", "compacted_day", "overflow_day")
+
+    def __init__(self, window, width=8):
+        self.days = np.full(window, -1, dtype=np.int64)
+        self.cases = np.zeros(window, dtype=np.int32)
+        self.symptoms = np.zeros((window, width), dtype=np.int32)
+        self.names = []
+        self.ids = {}
+        self.compacted_day = None
+        self.overflow_day = None
+
+    def compact(self, day, window):
+        """Drop columns with no counts left in the window; True if any were freed"""
+        live = self.days > day - window
+        self.symptoms[~live] = 0
+        self.days[~live] = -1
+        self.cases[~live] = 0
+        used = np.flatnonzero(self.symptoms.any(axis=0)[:len(self.names)])
+        if len(used) == len(self.names):
+            return False
+        kept = np.zeros_like(self.symptoms)
+        kept[:, :len(used)] = self.symptoms[:, used]
+        self.symptoms = kept
+        self.names = [self.names[i] for i in used]
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        return True
+
+
+class RegionalCaseStore:
+    """In-process sliding-window case counts per location and day.
+
+    Memory is bounded by ``max_locations`` x ``window`` days x
+    ``max_symptoms`` int32 counters, and in practice is window x the
+    symptoms a location actually reports. Buckets older than the window
+    roll off as their slots are reused, and the least recently updated
+    location is dropped once ``max_locations`` is reached. When a location
+    already tracks ``max_symptoms`` distinct symptoms within the window,
+    further new ones are counted as "other".
+    """
+
+    def __init__(self, window=90, max_locations=5000, max_symptoms=512):
+        self.window = window
+        self.max_locations = max_locations
+        self.max_symptoms = max_symptoms
+        self._locations = OrderedDict()
+        self.overflowed = 0
+
+    @staticmethod
+    def _key(location):
+        return location.strip().lower()
+
+    @staticmethod
+    def _today():
+        return date.today().toordinal()
+
+    def _full(self, buffer):
+        return len(buffer.names) - (OTHER_SYMPTOMS in buffer.ids) >= self.max_symptoms
+
+    def _column(self, buffer, key, name, day):
+        """Column for a symptom at this location, adding (or reclaiming) one if needed"""
+        column = buffer.ids.get(name)
+        if column is not None:
+            return column
+        if self._full(buffer) and buffer.compacted_day != day:
+            # At most one reclaim pass per location-day
+            buffer.compacted_day = day
+            buffer.compact(day, self.window)
+        if self._full(buffer):
+            self.overflowed += 1
+            if buffer.overflow_day != day:
+                buffer.overflow_day = day
+                print(f"⚠️ {key}: more than {self.max_symptoms} distinct symptoms in {self.window} days, "
+                      f"counting new ones as '{OTHER_SYMPTOMS}' on day {day}")
+            name = OTHER_SYMPTOMS
+            column = buffer.ids.get(name)
+            if column is not None:
+                return column
+        column = len(buffer.names)
+        if column == buffer.symptoms.shape[1]:
+            # One column beyond max_symptoms is left for "other"
+            width = min(column * 2, self.max_symptoms + 1)
+            grown = np.zeros((self.window, width), dtype=np.int32)
+            grown[:, :column] = buffer.symptoms
+            buffer.symptoms = grown
+        buffer.names.append(name)
+        buffer.ids[name] = column
+        return column
+
+    def record(self, location, symptoms, day=None):
+        """Count one case for location on day (defaults to today)"""
+        day = self._today() if day is None else day
+        key = self._key(location)
+
+        buffer = self._locations.get(key)
+        if buffer is None:
+            if len(self._locations) >= self.max_locations:
+                self._locations.popitem(last=False)
+            buffer = _LocationBuffer(self.window, min(8, self.max_symptoms))
+            self._locations[key] = buffer
+        else:
+            self._locations.move_to_end(key)
+
+        slot = day % self.window
+        if buffer.days[slot] != day:
+            buffer.days[slot] = day
+            buffer.cases[slot] = 0
+            buffer.symptoms[slot] = 0
+
+        buffer.cases[slot] += 1
+        columns = {self._column(buffer, key, s.strip().lower(), day) for s in symptoms}
+        row = buffer.symptoms[slot]
+        for column in columns:
+            row[column] += 1
+
+    def summary(self, location, days=7, top_symptoms=4, day=None):
+        """Totals over the last ``days`` days (clamped to the window).
+
+        Returns total cases, the per-day series oldest first, and the most
+        frequent symptoms in that span (ties alphabetically, as in
+        SharedCaseStore).
+        """
+        day = self._today() if day is None else day
+        days = max(1, min(int(days), self.window))
+        buffer = self._locations.get(self._key(location))
+
+        if buffer is None:
+            return {"total_cases": 0, "daily_cases": [0] * days, "common_symptoms": []}
+
+        wanted = np.arange(day - days + 1, day + 1, dtype=np.int64)
+        slots = wanted % self.window
+        live = buffer.days[slots] == wanted
+
+        daily_cases = np.where(live, buffer.cases[slots], 0)
+        totals = buffer.symptoms[slots[live]].sum(axis=0).tolist()
+        common = [name for _, name in heapq.nsmallest(
+            top_symptoms, ((-n, name) for n, name in zip(totals, buffer.names) if n)
+        )]
+
+        return {
+            "total_cases": int(daily_cases.sum()),
+            "daily_cases": daily_cases.tolist(),
+            "common_symptoms": common,
+        }
+
+
+def case_trend(daily_cases):
+    """Compare the later half of a daily series against the earlier half"""
+    half = len(daily_cases) // 2
+    if half == 0:
+        return "stable"
+    earlier = sum(daily_cases[:half])
+    later = sum(daily_cases[-half:])
+    if later > earlier * 1.2 and later - earlier >= 2:
+        return "increasing"
+    if earlier > later * 1.2 and earlier - later >= 2:
+        return "decreasing"
+    return "stable"
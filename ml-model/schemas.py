@@ -0,0 +1,121 @@
+import math
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+class Severity(str, Enum):
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+    UNKNOWN = "unknown"
+
+
+class Duration(str, Enum):
+    LESS_THAN_DAY = "less-than-day"
+    ONE_TO_THREE_DAYS = "1-3-days"
+    THREE_TO_SEVEN_DAYS = "3-7-days"
+    MORE_THAN_WEEK = "more-than-week"
+    UNKNOWN = "unknown"
+
+
+def _member(enum, value):
+    """Case/whitespace-insensitive enum lookup; unrecognised values map to UNKNOWN"""
+    if isinstance(value, enum):
+        return value
+    try:
+        return enum(str(value).strip().lower())
+    except ValueError:
+        return enum.UNKNOWN
+
+
+class PatientData(BaseModel):
+    """One patient report, normalized once at validation.
+
+    Severity and duration become enum members, matched ignoring case and
+    surrounding whitespace; unrecognised values become UNKNOWN and score
+    the same fallback weights as before (0.1 for severity, between low and
+    medium; 0.05 for duration). Symptoms become stripped, lowercased
+    tokens, so scoring never re-normalizes. Site indicators must be
+    finite numbers.
+    """
+
+    patient_id: str
+    symptoms: List[str]
+    location: str
+    severity: Severity
+    duration: Duration
+    population_density: int = 1000
+    site_indicators: Dict[str, float] = {}
+
+    @field_validator("severity", mode="before")
+    @classmethod
+    def _severity(cls, value):
+        return _member(Severity, value)
+
+    @field_validator("duration", mode="before")
+    @classmethod
+    def _duration(cls, value):
+        return _member(Duration, value)
+
+    @field_validator("symptoms")
+    @classmethod
+    def _symptoms(cls, value):
+        return [token for token in (s.strip().lower() for s in value) if token]
+
+    @field_validator("site_indicators")
+    @classmethod
+    def _site_indicators(cls, value):
+        bad = sorted(name for name, number in value.items() if not math.isfinite(number))
+        if bad:
+            raise ValueError(f"site_indicators must be finite numbers: {', '.join(bad)}")
+        return value
+
+
+class PatientBatch(BaseModel):
+    patients: List[PatientData]
+
+
+class AnalysisFactors(BaseModel):
+    high_risk_symptoms: bool
+    severity_factor: Severity
+    duration_factor: Duration
+    location_factor: bool
+
+
+class Prediction(BaseModel):
+    risk_level: str
+    risk_probability: float
+    similar_cases: int
+    location: str
+    outbreak_predicted: bool
+    recommendation: str
+    alert_required: bool
+    cluster_alerts: List[Dict[str, Any]]
+    model_confidence: float
+    model_outbreak_probability: Optional[float]
+    prediction_source: str
+    model_version: Optional[str]
+    analysis_factors: AnalysisFactors
+    timestamp: str
+
+
+class PredictionResponse(BaseModel):
+    success: bool
+    data: Prediction
+
+
+class _PatientRef(BaseModel):
+    patient_id: str
+
+
+# patient_id serializes first, as in the original batch output
+class BatchPrediction(Prediction, _PatientRef):
+    pass
+
+
+class BatchPredictionResponse(BaseModel):
+    success: bool
+    count: int
+    data: List[BatchPrediction]
@@ -0,0 +1,265 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+
+from cluster_detector import ClusterDetector
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS case_counts (
+    location TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    cases INTEGER NOT NULL,
+    PRIMARY KEY (location, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS symptom_counts (
+    location TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    symptom TEXT NOT NULL,
+    cases INTEGER NOT NULL,
+    PRIMARY KEY (location, day, symptom)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS syndrome_counts (
+    location TEXT NOT NULL,
+    syndrome TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    cases INTEGER NOT NULL,
+    PRIMARY KEY (location, syndrome, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cluster_alerts (
+    id INTEGER PRIMARY KEY,
+    location TEXT NOT NULL,
+    syndrome TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    alert TEXT NOT NULL,
+    UNIQUE (location, syndrome, day)
+);
+"""
+
+_UPSERT = "ON CONFLICT DO UPDATE SET cases = cases + 1 RETURNING cases"
+
+
+class SharedCaseStore:
+    """Regional case counts kept in SQLite so every worker process sees them.
+
+    Drop-in for RegionalCaseStore when the service runs with several
+    workers: record() and summary() keep the same signatures and results,
+    but counts live in a WAL-mode database file that all workers open. Each
+    record() is a single short transaction; rows older than the window are
+    pruned once per day.
+    """
+
+    def __init__(self, path, window=90, max_alerts=500):
+        self.path = path
+        self.window = window
+        self.max_alerts = max_alerts
+        self._conn = None
+        self._pruned_day = None
+        self._in_transaction = False
+
+    @property
+    def conn(self):
+        # Opened lazily so each worker process gets its own connection
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(location):
+        return location.strip().lower()
+
+    @staticmethod
+    def _today():
+        return date.today().toordinal()
+
+    def _prune(self, day):
+        if self._pruned_day == day:
+            return
+        self._pruned_day = day
+        oldest = day - self.window
+        conn = self.conn
+        conn.execute("DELETE FROM case_counts WHERE day <= ?", (oldest,))
+        conn.execute("DELETE FROM symptom_counts WHERE day <= ?", (oldest,))
+        conn.execute("DELETE FROM syndrome_counts WHERE day <= ?", (oldest,))
+        conn.execute(
+            "DELETE FROM cluster_alerts WHERE id <= (SELECT MAX(id) FROM cluster_alerts) - ?",
+            (self.max_alerts,),
+        )
+
+    def record(self, location, symptoms, day=None, syndromes=()):
+        """Count one case; returns today's shared count for each syndrome given"""
+        day = self._today() if day is None else day
+        key = self._key(location)
+        names = {s.strip().lower() for s in symptoms}
+        counts = {}
+
+        # Its own transaction, or part of an enclosing transaction() block
+        with self.transaction():
+            conn = self.conn
+            self._prune(day)
+            conn.execute(
+                "INSERT INTO case_counts VALUES (?, ?, 1) ON CONFLICT DO UPDATE SET cases = cases + 1",
+                (key, day),
+            )
+            conn.executemany(
+                "INSERT INTO symptom_counts VALUES (?, ?, ?, 1) ON CONFLICT DO UPDATE SET cases = cases + 1",
+                [(key, day, name) for name in names],
+            )
+            for syndrome in syndromes:
+                counts[syndrome] = conn.execute(
+                    f"INSERT INTO syndrome_counts VALUES (?, ?, ?, 1) {_UPSERT}", (key, syndrome, day)
+                ).fetchone()[0]
+        return counts
+
+    @contextmanager
+    def transaction(self):
+        """Group several record() calls into one write transaction (backfills)"""
+        if self._in_transaction:
+            yield
+            return
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._in_transaction = False
+
+    def reset(self):
+        """Delete every count and alert, e.g. before rebuilding baselines from history"""
+        with self.transaction():
+            for table in ("case_counts", "symptom_counts", "syndrome_counts", "cluster_alerts"):
+                self.conn.execute(f"DELETE FROM {table}")
+        self._pruned_day = None
+
+    def summary(self, location, days=7, top_symptoms=4, day=None):
+        """Same shape as RegionalCaseStore.summary"""
+        day = self._today() if day is None else day
+        days = max(1, min(int(days), self.window))
+        key = self._key(location)
+        first = day - days + 1
+
+        daily_cases = [0] * days
+        for d, cases in self.conn.execute(
+            "SELECT day, cases FROM case_counts WHERE location = ? AND day BETWEEN ? AND ?",
+            (key, first, day),
+        ):
+            daily_cases[d - first] = cases
+
+        # Ties break alphabetically rather than by first appearance
+        common = [name for name, _ in self.conn.execute(
+            "SELECT symptom, SUM(cases) AS total FROM symptom_counts "
+            "WHERE location = ? AND day BETWEEN ? AND ? GROUP BY symptom ORDER BY total DESC, symptom LIMIT ?",
+            (key, first, day, top_symptoms),
+        )]
+
+        return {
+            "total_cases": sum(daily_cases),
+            "daily_cases": daily_cases,
+            "common_symptoms": common,
+        }
+
+    def syndrome_counts(self, location, syndrome, first, last):
+        """{day: cases} for one syndrome series over [first, last]"""
+        return dict(self.conn.execute(
+            "SELECT day, cases FROM syndrome_counts WHERE location = ? AND syndrome = ? AND day BETWEEN ? AND ?",
+            (location, syndrome, first, last),
+        ))
+
+    def claim_alert(self, alert, day):
+        """Store an alert unless another worker already raised it for that series and day"""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO cluster_alerts (location, syndrome, day, alert) VALUES (?, ?, ?, ?)",
+            (alert["location"], alert["syndrome"], day, json.dumps(alert)),
+        )
+        return cursor.rowcount == 1
+
+    def recent_alerts(self, location=None, limit=50):
+        query = "SELECT alert FROM cluster_alerts"
+        params = []
+        if location is not None:
+            query += " WHERE location = ?"
+            params.append(self._key(location))
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [json.loads(row[0]) for row in self.conn.execute(query, params)]
+
+
+class SharedClusterDetector(ClusterDetector):
+    """ClusterDetector whose daily counts come from a SharedCaseStore.
+
+    Every worker folds the same shared daily totals into its baseline, so
+    all workers compute the same EWMA/CUSUM state; the alert table's unique
+    (location, syndrome, day) key makes sure only one of them reports a
+    spike. observe() records the case in the store itself, so callers must
+    not also call store.record() for it.
+    """
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def _get(self, key, day):
+        series = self._series.get(key)
+        if series is None:
+            # Start the baseline where the shared history for this series starts
+            history = self.store.syndrome_counts(*key, day - self.max_gap_days, day - 1)
+            series = super()._get(key, min(history, default=day))
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    def _close_day(self, series, day, key=None):
+        gap = day - series.day
+        if gap <= 0:
+            return
+        if gap > self.max_gap_days:
+            series.mean = series.var = series.cusum = 0.0
+            series.days_seen = 0
+        else:
+            closed = self.store.syndrome_counts(*key, series.day, day - 1)
+            for d in range(series.day, day):
+                self._update_baseline(series, closed.get(d, 0))
+        series.day = day
+        series.count = 0
+
+    def observe(self, location, symptoms, day=None):
+        """Record the case in the shared store; returns (similar cases, alerts raised)"""
+        day = self._today() if day is None else day
+        self.events += 1
+        syndromes = self.syndromes(symptoms)
+        today = self.store.record(location, symptoms, day, syndromes)
+        location = location.strip().lower()
+
+        similar = 0
+        raised = []
+        for syndrome in syndromes:
+            key = (location, syndrome)
+            series = self._get(key, day)
+            self._close_day(series, day, key)
+            series.count = today[syndrome]
+
+            recent = self.store.syndrome_counts(location, syndrome, day - self.window + 1, day)
+            similar = max(similar, sum(recent.values()))
+
+            alert = self._check(location, syndrome, series, day)
+            if alert is not None:
+                if self.store.claim_alert(alert, day):
+                    raised.append(alert)
+                else:
+                    self.alerts.pop()
+        return similar, raised
+
+    def recent_alerts(self, location=None, limit=50):
+        return self.store.recent_alerts(location, limit)
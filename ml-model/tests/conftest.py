@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests import the service the way it runs: from ml-model/, with the
+# repository root (common/) importable; state goes to a scratch directory
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+_TMP = tempfile.mkdtemp(prefix="ml-model-tests-")
+os.environ.setdefault("ML_EVENT_LOG_DIR", os.path.join(_TMP, "events"))
+os.environ.setdefault("ML_MODEL_WARMUP", "0")
+os.environ.pop("ML_SHARED_STATE_PATH", None)
+os.environ.pop("WEB_CONCURRENCY", None)
+
+
+def patient(patient_id="p1", symptoms=("fever", "cough"), location="Camp A", severity="medium",
+            duration="1-3-days", **extra):
+    """A request body for /predict-outbreak"""
+    return {"patient_id": patient_id, "symptoms": list(symptoms), "location": location,
+            "severity": severity, "duration": duration, **extra}
+
+
+def train_model(path, positive_rate):
+    """A tiny classifier over the service's features, saved with joblib"""
+    import joblib
+    import pandas as pd
+    from sklearn.dummy import DummyClassifier
+
+    from model_registry import FEATURE_DEFAULTS
+
+    frame = pd.DataFrame([FEATURE_DEFAULTS] * 10)
+    labels = [1] * int(10 * positive_rate) + [0] * (10 - int(10 * positive_rate))
+    joblib.dump(DummyClassifier(strategy="prior").fit(frame, labels), path)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """The ML service with in-process state and its own event log"""
+    import main
+    from event_log import EventLog
+    from fastapi.testclient import TestClient
+
+    # Each TestClient runs its own event loop; give it a log bound to that loop
+    monkeypatch.setattr(main, "event_log", EventLog(str(tmp_path / "events"), hash_key=b"test-key"))
+    with TestClient(main.app) as test_client:
+        yield test_client
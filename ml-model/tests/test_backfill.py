@@ -0,0 +1,107 @@
+import argparse
+import json
+
+import pandas as pd
+import pytest
+
+import backfill
+from conftest import train_model
+from outbreak_predictor import OutbreakPredictor
+from schemas import PatientData
+from shared_store import SharedCaseStore
+
+ROWS = [
+    {"patient_id": 1, "symptoms": "fever;cough;difficulty_breathing", "location": "Camp A",
+     "severity": "high", "duration": "3-7-days", "timestamp": "2024-03-01T08:00:00"},
+    {"patient_id": 2, "symptoms": '["rash", "headache"]', "location": "Town", "severity": "LOW",
+     "duration": "1-3-days", "timestamp": "2024-03-01T09:00:00"},
+    {"patient_id": 3, "symptoms": "[not json", "location": "Camp A", "severity": "high",
+     "duration": "1-3-days", "timestamp": "2024-03-02T08:00:00"},
+    {"patient_id": 4, "symptoms": "diarrhea|vomiting", "location": None, "severity": "medium",
+     "duration": "1-3-days", "timestamp": "2024-03-02T09:00:00"},
+    {"patient_id": 5, "symptoms": "fever, vomiting", "location": "camp a", "severity": "critical",
+     "duration": "weeks", "timestamp": "2024-03-03T08:00:00"},
+]
+
+
+def run_backfill(tmp_path, rows, suffix=".csv", **options):
+    source = tmp_path / f"triage{suffix}"
+    frame = pd.DataFrame(rows)
+    if suffix == ".csv":
+        frame.to_csv(source, index=False)
+    else:
+        frame.to_json(source, orient="records", lines=True)
+    output = tmp_path / f"scored{suffix}"
+    args = argparse.Namespace(
+        input=str(source), output=str(output), format=None, chunk_size=2, workers=0,
+        timestamp_column="timestamp", model=str(tmp_path / "no-model.pkl"), no_model=False,
+        replay=False, state_path=str(tmp_path / "shared.db"), reset=False, progress_seconds=60,
+    )
+    vars(args).update(options)
+    summary = backfill.run(args)
+    if suffix == ".csv":
+        return summary, pd.read_csv(output, dtype={"patient_id": str})
+    return summary, pd.read_json(output, lines=True, dtype={"patient_id": str})
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_scores_match_the_service_in_input_order(tmp_path, suffix):
+    summary, scored = run_backfill(tmp_path, ROWS, suffix)
+
+    assert summary["rows_read"] == 5 and summary["rows_scored"] == 3 and summary["rows_skipped"] == 2
+    assert scored["patient_id"].tolist() == ["1", "2", "5"]
+    predictor = OutbreakPredictor()
+    expected = [
+        predictor.predict_risk(p.symptoms, p.severity, p.location, p.duration)
+        for p in (PatientData(**{**row, "patient_id": str(row["patient_id"]),
+                                 "symptoms": backfill.parse_symptoms(row["symptoms"])})
+                  for row in (ROWS[0], ROWS[1], ROWS[4]))
+    ]
+    assert scored["risk_probability"].tolist() == [round(r, 3) for r in expected]
+    assert scored["prediction_source"].tolist() == ["rules"] * 3
+    assert scored.columns.tolist() == backfill.OUTPUT_COLUMNS
+
+
+def test_parse_symptoms():
+    assert backfill.parse_symptoms("fever; cough |rash,") == ["fever", "cough", "rash"]
+    assert backfill.parse_symptoms('["fever", "cough"]') == ["fever", "cough"]
+    assert backfill.parse_symptoms(None) == []
+    with pytest.raises(ValueError):
+        backfill.parse_symptoms("[fever")
+
+
+def test_replay_counts_rows_on_their_own_day(tmp_path):
+    summary, _ = run_backfill(tmp_path, ROWS, replay=True, reset=True)
+    store = SharedCaseStore(str(tmp_path / "shared.db"), window=90)
+    camp = store.summary("Camp A", days=3, day=pd.Timestamp("2024-03-03").toordinal())
+
+    # Rows 3 and 4 were skipped, so they are not replayed either
+    assert camp["daily_cases"] == [1, 0, 1]
+    assert summary["replayed_into"] == str(tmp_path / "shared.db")
+    assert summary["out_of_order_rows"] == 0
+
+
+def test_model_scores_use_the_replayed_counts(tmp_path, monkeypatch):
+    model = tmp_path / "model.pkl"
+    train_model(str(model), 0.3)
+    seen = []
+    score_model = backfill.score_model
+
+    def recording(features):
+        seen.extend(features["attack_rate_percent"].tolist())
+        return score_model(features)
+
+    monkeypatch.setattr(backfill, "score_model", recording)
+    summary, scored = run_backfill(tmp_path, ROWS, model=str(model), chunk_size=10)
+
+    assert summary["model"] is True
+    assert scored["prediction_source"].tolist() == ["rules+model"] * 3
+    assert scored["model_outbreak_probability"].tolist() == [0.3] * 3
+    # Camp A has 1 then 2 cases in the week (the skipped row is not counted); Town has 1
+    population = 25000.0
+    assert seen == pytest.approx([100 / population, 100 / population, 200 / population])
+
+
+def test_summary_is_printed_as_json(tmp_path, capsys):
+    run_backfill(tmp_path, ROWS[:1])
+    assert json.loads(capsys.readouterr().err.strip().splitlines()[-1])["rows_scored"] == 1
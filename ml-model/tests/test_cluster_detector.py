@@ -0,0 +1,49 @@
+from cluster_detector import ClusterDetector
+
+
+def feed(detector, day, cases, location="Camp A", symptoms=("cough",)):
+    """Observe cases patients on day; returns the alerts raised"""
+    alerts = []
+    for _ in range(cases):
+        alerts += detector.observe(location, list(symptoms), day=day)[1]
+    return alerts
+
+
+def test_steady_small_counts_do_not_alert():
+    detector = ClusterDetector()
+    alerts = []
+    for day in range(1, 91):
+        alerts += feed(detector, day, 5 + day % 2)
+    # One case above the usual range is noise, not an outbreak
+    alerts += feed(detector, 91, 7)
+    assert alerts == []
+
+
+def test_quiet_weekly_pattern_does_not_alert():
+    detector = ClusterDetector()
+    weekly = [8, 6, 11, 7, 9, 5, 10]
+    alerts = []
+    for day in range(1, 120):
+        alerts += feed(detector, day, weekly[day % 7])
+    assert alerts == []
+
+
+def test_spike_over_the_baseline_alerts_once():
+    detector = ClusterDetector()
+    for day in range(1, 31):
+        assert feed(detector, day, 5 + day % 2) == []
+
+    alerts = feed(detector, 31, 25)
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert["location"] == "camp a" and alert["syndrome"] == "respiratory"
+    assert alert["method"] == "ewma_zscore"
+    assert alert["baseline_sd"] >= 2.0
+    assert feed(detector, 31, 10) == []      # at most one alert per series per day
+
+
+def test_burst_alerts_during_warmup():
+    detector = ClusterDetector(burst_cases=15)
+    alerts = feed(detector, 1, 15, symptoms=("watery diarrhea",))
+    assert [a["method"] for a in alerts] == ["burst"]
+    assert alerts[0]["syndrome"] == "gastrointestinal"
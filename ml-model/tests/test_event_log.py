@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import numpy as np
+
+from event_log import EventLog, list_segments, read_events, symptom_bit
+from schemas import Duration, Severity
+
+
+def write_events(directory, events, **kwargs):
+    async def scenario():
+        log = EventLog(directory, hash_key=b"test-key", **kwargs)
+        await log.start()
+        for event in events:
+            assert log.push(*event)
+        await log.stop()
+        return log
+
+    return asyncio.run(scenario())
+
+
+def test_events_round_trip_through_segments(tmp_path):
+    directory = str(tmp_path / "events")
+    events = [
+        ("p1", "Camp A", ["fever", "cough"], Severity.HIGH, Duration.ONE_TO_THREE_DAYS, 100.0),
+        ("p2", " camp a ", ["itchy eyes"], Severity.LOW, Duration.UNKNOWN, 200.0),
+        ("p3", "Town", [], Severity.UNKNOWN, Duration.MORE_THAN_WEEK, 300.0),
+    ]
+    log = write_events(directory, events, segment_rows=2)
+
+    assert log.stats()["written"] == 3 and log.stats()["segments"] == 2
+    frame = read_events(directory)
+    assert frame["ts"].tolist() == [100.0, 200.0, 300.0]
+    assert frame["location"].tolist() == ["camp a", "camp a", "town"]
+    assert frame["patient"].tolist() == [log.patient_hash(p) for p, *_ in events]
+    assert bool(frame["symptoms"][0] & symptom_bit("fever")) and bool(frame["symptoms"][0] & symptom_bit("cough"))
+    assert frame["symptoms"][1] == np.uint64(1 << 63)
+    assert frame["symptoms"][2] == 0
+    assert frame["severity"].tolist() == [list(Severity).index(s) for s in
+                                          (Severity.HIGH, Severity.LOW, Severity.UNKNOWN)]
+
+
+def test_time_filters_and_column_selection(tmp_path):
+    directory = str(tmp_path / "events")
+    write_events(directory, [(f"p{i}", f"camp {i % 3}", ["fever"], Severity.LOW, Duration.UNKNOWN, float(i))
+                             for i in range(10)], segment_rows=4)
+
+    assert len(list_segments(directory, since=4, until=8)) == 1
+    assert len(list_segments(directory, since=3, until=9)) == 3
+    frame = read_events(directory, since=3, until=7, columns=("ts", "location"))
+    assert list(frame.columns) == ["ts", "location"]
+    assert frame["ts"].tolist() == [3.0, 4.0, 5.0, 6.0]
+    # Location dictionaries of different segments merge into one Categorical
+    assert frame["location"].tolist() == ["camp 0", "camp 1", "camp 2", "camp 0"]
+    assert read_events(str(tmp_path / "missing")).empty
+
+
+def test_hash_key_is_generated_once_and_kept(tmp_path):
+    directory = str(tmp_path / "events")
+    first = EventLog(directory)
+    second = EventLog(directory)
+    assert first.patient_hash("p1") == second.patient_hash("p1")
+    assert os.path.exists(os.path.join(directory, EventLog.KEY_FILE))
+    assert EventLog(str(tmp_path / "other")).patient_hash("p1") != first.patient_hash("p1")
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    async def scenario():
+        log = EventLog(str(tmp_path / "events"), queue_size=2, hash_key=b"k")
+        accepted = [log.push("p", "camp", [], Severity.LOW, Duration.UNKNOWN) for _ in range(3)]
+        return log, accepted
+
+    log, accepted = asyncio.run(scenario())
+    assert accepted == [True, True, False]
+    assert log.stats()["dropped"] == 1
@@ -0,0 +1,145 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+import main
+from conftest import patient, train_model
+from model_registry import ModelBatcher, ModelRegistry, build_features
+from schemas import PatientData
+
+
+class FakeRegistry:
+    """Scores every row 0.5, and fails any frame holding a negative sanitation score"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, features):
+        self.calls.append(len(features))
+        if (features["sanitation_score"] < 0).any():
+            raise ValueError("Input X contains bad values")
+        return np.full(len(features), 0.5)
+
+
+def test_non_finite_site_indicators_are_rejected():
+    with pytest.raises(ValidationError, match="sanitation_score"):
+        PatientData(**patient(site_indicators={"sanitation_score": float("inf")}))
+    with pytest.raises(ValidationError):
+        PatientData(**patient(site_indicators={"rainfall_mm": float("nan")}))
+
+
+def test_endpoint_answers_422_for_overflowing_indicators(client):
+    body = '{"patient_id": "p1", "symptoms": ["fever"], "location": "Camp A", "severity": "high", ' \
+           '"duration": "1-3-days", "site_indicators": {"sanitation_score": 1e400}}'
+    response = client.post("/predict-outbreak", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_one_bad_request_does_not_fail_its_batch():
+    registry = FakeRegistry()
+    batcher = ModelBatcher(registry, max_wait=0.01)
+    good = [PatientData(**patient(f"p{i}")) for i in range(3)]
+    bad = PatientData(**patient("bad", site_indicators={"sanitation_score": -1.0}))
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.predict(good[:2], [0, 0]),
+            batcher.predict([bad], [0]),
+            batcher.predict(good[2:], [0]),
+            return_exceptions=True,
+        )
+
+    first, failed, last = asyncio.run(scenario())
+    assert list(first) == [0.5, 0.5] and list(last) == [0.5]
+    assert isinstance(failed, ValueError)
+    # One combined attempt, then each request on its own
+    assert registry.calls == [4, 2, 1, 1]
+    assert batcher.stats()["errors"] == 1
+
+
+def test_model_error_falls_back_to_the_rules_result(client, monkeypatch):
+    async def broken(patients, recent_cases):
+        raise ValueError("Input X contains infinity")
+
+    monkeypatch.setattr(main.model_registry, "_model", object())
+    monkeypatch.setattr(main.model_registry, "_checked_at", float("inf"))
+    monkeypatch.setattr(main.model_batcher, "predict", broken)
+    response = client.post("/predict-outbreak", json=patient(severity="high"))
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["prediction_source"] == "rules"
+    assert data["model_outbreak_probability"] is None
+    assert data["risk_probability"] > 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def features(n=2):
+    return build_features([PatientData(**patient(f"p{i}")) for i in range(n)], [0] * n)
+
+
+def test_registry_loads_lazily_and_reloads_a_changed_file(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    train_model(path, 0.3)
+    clock = FakeClock()
+    registry = ModelRegistry(path, reload_seconds=30, clock=clock)
+    assert registry.predict_proba(features()) is None
+
+    async def scenario():
+        await registry.ensure_loaded()
+        first = (registry.version, list(registry.predict_proba(features())))
+
+        train_model(path, 0.8)
+        os.utime(path, (1_000_000_000, 1_000_000_000))
+        await registry.ensure_loaded()            # within reload_seconds: not even stat'ed
+        assert registry.version == first[0]
+        clock.now = 31
+        await registry.ensure_loaded()
+        await registry._reload_task
+        return first
+
+    version, probabilities = asyncio.run(scenario())
+    assert probabilities == pytest.approx([0.3, 0.3])
+    assert registry.version != version
+    assert list(registry.predict_proba(features())) == pytest.approx([0.8, 0.8])
+    assert registry.info()["state"] == "loaded"
+
+
+def test_registry_without_a_usable_file_leaves_the_rules_in_charge(tmp_path):
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"not a pickle")
+    registry = ModelRegistry(str(path))
+
+    asyncio.run(registry.ensure_loaded())
+    assert registry.state == "failed" and registry.error
+    assert not registry.loaded
+    assert registry.predict_proba(features()) is None
+
+
+def test_failed_reload_keeps_the_current_model(tmp_path):
+    path = tmp_path / "model.pkl"
+    train_model(str(path), 0.3)
+    clock = FakeClock()
+    registry = ModelRegistry(str(path), reload_seconds=30, clock=clock)
+
+    async def scenario():
+        await registry.ensure_loaded()
+        path.write_bytes(b"truncated")
+        os.utime(path, (1_000_000_000, 1_000_000_000))
+        clock.now = 31
+        await registry.ensure_loaded()
+        await registry._reload_task
+
+    asyncio.run(scenario())
+    assert registry.state == "loaded" and registry.error
+    assert list(registry.predict_proba(features())) == pytest.approx([0.3, 0.3])
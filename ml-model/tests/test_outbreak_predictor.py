@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from conftest import patient
+from outbreak_predictor import OutbreakPredictor, classify_risk
+from schemas import PatientData
+
+SYMPTOMS = [
+    "fever", "high fever", "cough", "dry cough", "difficulty_breathing", "diarrhea", "vomiting",
+    "headache", "rash", "chest_pain", "severe_pain", "fever_and_chest_pain", "FEVER", "  Cough ",
+    "", "   ", "حمى", "unknown-symptom", "fevercough",
+]
+SEVERITIES = ["high", "medium", "low", "HIGH", " Medium ", "unknown", "critical", ""]
+DURATIONS = ["less-than-day", "1-3-days", "3-7-days", "more-than-week", "unknown", "two weeks", ""]
+LOCATIONS = ["Camp A", "north CAMP", "Town centre", "", "Kakuma"]
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    return OutbreakPredictor()
+
+
+def random_patients(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        PatientData(**patient(
+            f"p{i}",
+            symptoms=rng.sample(SYMPTOMS, rng.randint(0, 6)),
+            location=rng.choice(LOCATIONS),
+            severity=rng.choice(SEVERITIES),
+            duration=rng.choice(DURATIONS),
+        ))
+        for i in range(n)
+    ]
+
+
+def test_batch_matches_single_scoring_exactly(predictor):
+    patients = random_patients(2000)
+    batch = predictor.predict_risk_batch(patients)
+    single = [predictor.predict_risk(p.symptoms, p.severity, p.location, p.duration) for p in patients]
+    # Bit-for-bit, not approximately: both paths must classify identically
+    assert [float(r) for r in batch] == single
+
+
+def test_batch_matches_single_on_edge_cases(predictor):
+    patients = [
+        PatientData(**patient("empty", symptoms=[])),
+        PatientData(**patient("blank", symptoms=["", "  "])),
+        PatientData(**patient("capped", symptoms=["fever", "difficulty_breathing", "chest_pain", "severe_pain",
+                                                  "cough"], severity="high", duration="more-than-week")),
+        PatientData(**patient("repeats", symptoms=["fever"] * 9)),
+        PatientData(**patient("unknowns", severity="severe", duration="forever", location="")),
+    ]
+    batch = predictor.predict_risk_batch(patients)
+    single = [predictor.predict_risk(p.symptoms, p.severity, p.location, p.duration) for p in patients]
+    assert [float(r) for r in batch] == single
+    assert single[2] == 1.0
+
+
+def test_empty_batch(predictor):
+    assert len(predictor.predict_risk_batch([])) == 0
+
+
+def test_unknown_severity_and_duration_use_fallback_weights(predictor):
+    known = PatientData(**patient(symptoms=[], location="Town", severity="low", duration="1-3-days"))
+    unknown = PatientData(**patient(symptoms=[], location="Town", severity="critical", duration="weeks"))
+    low = predictor.predict_risk(known.symptoms, known.severity, known.location, known.duration)
+    fallback = predictor.predict_risk(unknown.symptoms, unknown.severity, unknown.location, unknown.duration)
+    # 0.1 instead of 0.05 for severity; duration falls back to the same 0.05
+    assert fallback == pytest.approx(low + 0.05)
+    assert classify_risk(low) == "Low" and classify_risk(fallback) == "Medium"
@@ -0,0 +1,79 @@
+from regional_store import RegionalCaseStore, case_trend
+
+
+def test_summary_counts_cases_and_common_symptoms():
+    store = RegionalCaseStore(window=30)
+    store.record("Camp A", ["fever", "cough"], day=100)
+    store.record(" camp a ", ["Fever", "rash"], day=101)
+    store.record("Camp A", ["fever", "fever"], day=101)       # one case, one fever
+
+    summary = store.summary("CAMP A", days=3, day=101)
+    assert summary["total_cases"] == 3
+    assert summary["daily_cases"] == [0, 1, 2]
+    # Most frequent first, ties alphabetically
+    assert summary["common_symptoms"] == ["fever", "cough", "rash"]
+    assert store.summary("Camp B", days=3, day=101) == {
+        "total_cases": 0, "daily_cases": [0, 0, 0], "common_symptoms": []
+    }
+
+
+def test_old_days_roll_off_the_ring():
+    store = RegionalCaseStore(window=7)
+    for day in range(100, 110):
+        store.record("camp", ["cough"] if day < 105 else ["diarrhea"], day=day)
+
+    summary = store.summary("camp", days=7, day=109)
+    assert summary["daily_cases"] == [1] * 7
+    assert summary["total_cases"] == 7
+
+    # A slot reused after a gap holds only the new day's counts
+    store.record("camp", ["rash"], day=120)
+    summary = store.summary("camp", days=7, day=120)
+    assert summary["daily_cases"] == [0] * 6 + [1]
+    assert summary["common_symptoms"] == ["rash"]
+
+
+def test_days_are_clamped_to_the_window():
+    store = RegionalCaseStore(window=7)
+    store.record("camp", ["fever"], day=10)
+    assert len(store.summary("camp", days=90, day=10)["daily_cases"]) == 7
+    assert len(store.summary("camp", days=0, day=10)["daily_cases"]) == 1
+
+
+def test_least_recently_updated_location_is_dropped():
+    store = RegionalCaseStore(window=7, max_locations=2)
+    store.record("a", ["fever"], day=1)
+    store.record("b", ["fever"], day=1)
+    store.record("a", ["fever"], day=1)
+    store.record("c", ["fever"], day=1)
+    assert store.summary("b", days=1, day=1)["total_cases"] == 0
+    assert store.summary("a", days=1, day=1)["total_cases"] == 2
+
+
+def test_symptoms_beyond_the_cap_count_as_other_and_warn_each_day(capsys):
+    store = RegionalCaseStore(window=30, max_symptoms=3)
+    store.record("camp", ["s1", "s2", "s3"], day=1)
+    store.record("camp", ["s4"], day=1)
+    store.record("camp", ["s5"], day=1)
+    store.record("camp", ["s6"], day=2)
+
+    assert store.overflowed == 3
+    assert store.summary("camp", days=2, day=2)["common_symptoms"][0] == "other"
+    # One warning per overflowing location-day, even once "other" exists
+    assert capsys.readouterr().out.count("counting new ones as 'other'") == 2
+
+
+def test_columns_are_reclaimed_once_their_days_roll_off():
+    store = RegionalCaseStore(window=7, max_symptoms=3)
+    store.record("camp", ["s1", "s2", "s3"], day=1)
+    store.record("camp", ["s4", "s5"], day=20)
+
+    assert store.overflowed == 0
+    assert store.summary("camp", days=7, day=20)["common_symptoms"] == ["s4", "s5"]
+
+
+def test_case_trend():
+    assert case_trend([1, 1, 1, 4, 5, 6]) == "increasing"
+    assert case_trend([6, 5, 4, 1, 1, 1]) == "decreasing"
+    assert case_trend([3, 3, 3, 3]) == "stable"
+    assert case_trend([9]) == "stable"
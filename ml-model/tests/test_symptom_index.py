@@ -0,0 +1,66 @@
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from conftest import patient
+from outbreak_predictor import HIGH_RISK_SYMPTOMS, OutbreakPredictor
+from schemas import Duration, PatientData, Severity
+
+COMBINATIONS = [
+    ["fever", "cough", "difficulty_breathing"],
+    ["fever", "diarrhea", "vomiting"],
+    ["fever", "headache", "rash"],
+]
+TOKENS = ["fever", "cough", "difficulty_breathing", "diarrhea", "vomiting", "headache", "rash",
+          "chest_pain", "severe_pain", "fevercough", "no fever", "rashes", "itch", ""]
+
+
+def reference_symptom_risk(symptoms):
+    """The symptom part of the original string-scanning rules"""
+    joined = " ".join(symptoms)
+    risk = 0.4 if any(all(term in joined for term in combo) for combo in COMBINATIONS) else 0.0
+    for symptom in symptoms:
+        for term in HIGH_RISK_SYMPTOMS:
+            if term in symptom:
+                risk += 0.15
+    return risk
+
+
+@pytest.fixture(scope="module")
+def index():
+    return OutbreakPredictor().symptom_index
+
+
+def test_index_matches_substring_rules(index):
+    rng = random.Random(3)
+    for _ in range(2000):
+        symptoms = rng.sample(TOKENS, rng.randint(0, 5))
+        mask, hits = index.resolve(symptoms)
+        risk = (0.4 if index.combo_hit(mask) else 0.0) + 0.15 * hits
+        assert risk == pytest.approx(reference_symptom_risk(symptoms)), symptoms
+
+
+def test_one_token_can_carry_several_terms(index):
+    mask, hits = index.resolve(["fever_and_chest_pain"])
+    assert hits == 2
+    assert mask & index.bits["fever"] and mask & index.bits["chest_pain"]
+
+
+def test_patient_data_normalizes_once():
+    data = PatientData(**patient(symptoms=[" Fever ", "COUGH", "", "   "], severity=" HIGH ",
+                                 duration="More-Than-Week"))
+    assert data.symptoms == ["fever", "cough"]
+    assert data.severity is Severity.HIGH
+    assert data.duration is Duration.MORE_THAN_WEEK
+
+
+def test_unrecognised_enums_become_unknown():
+    data = PatientData(**patient(severity="critical", duration=None))
+    assert data.severity is Severity.UNKNOWN
+    assert data.duration is Duration.UNKNOWN
+
+
+def test_symptoms_must_be_a_list():
+    with pytest.raises(ValidationError):
+        PatientData(**{**patient(), "symptoms": "fever"})